@@ -9,28 +9,519 @@ Project: ChatTokener Suite
 Component: Claude Conversation Parser
 """
 
+import hashlib
+import io
+import itertools
 import json
+import mmap
 import os
+import re
+import select
+import shutil
+import struct
+import time
+from contextlib import contextmanager, redirect_stdout
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import argparse
 
+# Decoder JSON per le righe dei transcript: auto, orjson, msgspec o json
+JSON_BACKEND = os.environ.get('CLAUDE_PARSER_JSON_BACKEND', 'auto')
+_FAST_LOADS = None
+
+# Checkpoint della modalità --watch
+CACHE_DIR = os.environ.get('CLAUDE_PARSER_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'claude_parser')
+WATCH_CHECKPOINT_VERSION = 1
+CHECKPOINT_TAIL_BYTES = 64  # Byte prima dell'offset usati per riconoscere un file riscritto
+WATCH_POLL_INTERVAL = 1.0  # Secondi tra due controlli quando inotify non è disponibile
+WATCH_DEBOUNCE = 0.2  # Attesa dopo una modifica per raccogliere le scritture successive
+
+# Manifest dei file già convertiti: da aggiornare quando cambia il markdown generato
+MANIFEST_VERSION = 1
+# Nome di un markdown numerato: data, progetto e numero _N della conversazione
+NUMBERED_NAME = re.compile(r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-(.+)_(\d+)\.md$')
+# Messaggi iniziali letti da --list per trovare il primo timestamp (il primo
+# messaggio può essere un riepilogo che non lo ha)
+HEADER_MESSAGES = 10
+
+
+def set_json_backend(name: str = 'auto') -> str:
+    """
+    Seleziona il decoder JSON e restituisce il nome di quello in uso.
+    orjson e msgspec sono opzionali: 'auto' li prova in quest'ordine e,
+    se non sono installati, si torna al modulo json standard.
+    """
+    global _FAST_LOADS
+    candidates = ('orjson', 'msgspec') if name == 'auto' else (name,)
+    for candidate in candidates:
+        try:
+            if candidate == 'orjson':
+                import orjson
+                _FAST_LOADS = orjson.loads
+                return candidate
+            if candidate == 'msgspec':
+                import msgspec
+                _FAST_LOADS = msgspec.json.Decoder().decode
+                return candidate
+        except ImportError:
+            continue
+    _FAST_LOADS = json.loads
+    return 'json'
+
+
+def json_loads(line):
+    """Decodifica una riga JSONL con il backend selezionato"""
+    if _FAST_LOADS is None:
+        set_json_backend(JSON_BACKEND)
+    loads = _FAST_LOADS
+    if loads is json.loads:
+        return loads(line)
+    try:
+        return loads(line)
+    except Exception:
+        # I backend veloci sono più severi (interi enormi, NaN...): decide json,
+        # che solleva anche il JSONDecodeError atteso per le righe non valide
+        return json.loads(line)
+
+
+@contextmanager
+def map_file(file_path):
+    """
+    Mappa un file in sola lettura: le righe si trovano con find() sui byte
+    grezzi, senza decodificare l'intero file in str. I file vuoti o non
+    mappabili vengono letti normalmente.
+    """
+    with open(file_path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            yield f.read()
+            return
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def iter_jsonl_stream(stream, state: Optional[Dict[str, Any]] = None,
+                      on_error: Optional[Callable[[Exception], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Decodifica i messaggi da uno stream binario o da un iterabile di righe
+    JSONL (bytes o str). Le righe non valide vengono saltate, passando
+    l'errore a on_error se indicata.
+    Se state è un dict, la lettura riprende da state['offset'] (la
+    posizione dello stream) e state['first']; vengono lette solo le righe
+    complete, state['offset'] resta alla fine dell'ultima e state['line']
+    indica l'inizio della riga dell'ultimo messaggio restituito.
+    """
+    first = state.get('first', True) if state is not None else True
+    offset = state.get('offset', 0) if state is not None else 0
+    for line in stream:
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        line_start = offset
+        offset += len(line)
+        if state is not None:
+            if not line.endswith(b'\n'):
+                break  # Riga ancora in scrittura: verrà letta al prossimo aggiornamento
+            state['offset'] = offset
+        # Stesso filtro di iter_jsonl_file: dopo il primo messaggio solo user e assistant
+        if not first and b'"user"' not in line and b'"assistant"' not in line:
+            continue
+        if line.strip():
+            try:
+                message = json_loads(line)
+            except json.JSONDecodeError as e:
+                if on_error is not None:
+                    on_error(e)
+                continue
+            first = False
+            if state is not None:
+                state['first'] = False
+                state['line'] = line_start
+            yield message
+
+
+def extract_text_content(content: Any) -> str:
+    """Estrae il contenuto testuale da diversi formati di messaggio"""
+    if isinstance(content, list):
+        text_parts = []
+        
+        for item in content:
+            if isinstance(item, dict):
+                if item.get('type') == 'text':
+                    text = item.get('text', '').strip()
+                    if text:
+                        text_parts.append(text)
+                elif item.get('type') == 'tool_use':
+                    # Formatta i tool use
+                    tool_name = item.get('name', 'Unknown Tool')
+                    tool_input = item.get('input', {})
+                    
+                    if tool_name == 'Read':
+                        file_path = tool_input.get('file_path', 'Unknown file')
+                        text_parts.append(f"Read file: {file_path}")
+                    elif tool_name == 'Write' or tool_name == 'Edit':
+                        file_path = tool_input.get('file_path', 'Unknown file')
+                        text_parts.append(f"{tool_name} file: {file_path}")
+                    elif tool_name == 'LS':
+                        path = tool_input.get('path', 'Unknown path')
+                        text_parts.append(f"<details>\n            <summary>Listed directory {path}</summary>\n        \n(Directory listing will appear here)\n\n</details>")
+                    else:
+                        # Per altri tool, usa un formato generico
+                        text_parts.append(f"{tool_name}: {json.dumps(tool_input, indent=2)}")
+        
+        return '\n\n'.join(text_parts) if text_parts else ''
+    elif isinstance(content, str):
+        return content
+    else:
+        return str(content)
+
+
+class Message:
+    """
+    Messaggio user o assistant di un turno, ridotto a quello che serve al
+    markdown: il testo (con i tool use già formattati) e il timestamp
+    """
+    __slots__ = ('text', 'timestamp')
+    
+    def __init__(self, text: str, timestamp: Optional[str] = None):
+        self.text = text
+        self.timestamp = timestamp
+    
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> 'Message':
+        text = ""
+        if 'message' in entry and 'content' in entry['message']:
+            text = extract_text_content(entry['message']['content'])
+        return cls(text, entry.get('timestamp'))
+
+
+class ToolResult:
+    """Output di un tool (toolUseResult): solo stdout e stderr finiscono nel markdown"""
+    __slots__ = ('stdout', 'stderr')
+    
+    def __init__(self, stdout: Optional[str] = None, stderr: Optional[str] = None):
+        self.stdout = stdout
+        self.stderr = stderr
+    
+    @classmethod
+    def from_entry(cls, result: Any) -> Optional['ToolResult']:
+        """None per i risultati che non producono markdown"""
+        if isinstance(result, dict):
+            stdout, stderr = result.get('stdout'), result.get('stderr')
+        elif isinstance(result, str) and result.strip():
+            stdout, stderr = result, None
+        else:
+            return None
+        if not stdout and not stderr:
+            return None
+        return cls(stdout, stderr)
+
+
+class Turn:
+    """Un messaggio user seguito dalle risposte dell'assistant e dai risultati dei tool"""
+    __slots__ = ('user', 'assistant_messages', 'tool_results')
+    
+    def __init__(self):
+        self.user: Optional[Message] = None
+        self.assistant_messages: List[Message] = []
+        self.tool_results: List[ToolResult] = []
+    
+    def is_empty(self) -> bool:
+        return self.user is None and not self.assistant_messages
+
+
+def group_turns(messages: Iterable[Dict[str, Any]], state: Optional[Dict[str, Any]] = None) -> Iterator[Turn]:
+    """
+    Raggruppa i messaggi in turni man mano che arrivano: ogni turno viene
+    restituito appena inizia il successivo, quindi in memoria ce n'è uno solo.
+    Se state è un dict, l'ultimo turno (che può ancora crescere) non viene
+    restituito ma lasciato in state['turn'], da cui riparte la chiamata successiva.
+    """
+    current_turn = state.get('turn') if state is not None else None
+    if current_turn is None:
+        current_turn = Turn()
+    
+    for msg in messages:
+        msg_type = msg.get('type', 'unknown')
+        
+        if msg_type == 'user':
+            # Controlla se è un tool result
+            if 'toolUseResult' in msg:
+                # È un tool result, aggiungilo al turno corrente senza creare un nuovo turno
+                result = ToolResult.from_entry(msg['toolUseResult'])
+                if result is not None:
+                    current_turn.tool_results.append(result)
+            else:
+                # È un vero messaggio user, quindi inizia un nuovo turno
+                if not current_turn.is_empty():
+                    yield current_turn
+                    current_turn = Turn()
+                current_turn.user = Message.from_entry(msg)
+                
+        elif msg_type == 'assistant':
+            # Aggiungi TUTTI i messaggi dell'assistente (possono essere multipli)
+            current_turn.assistant_messages.append(Message.from_entry(msg))
+    
+    # Restituisci l'ultimo turno
+    if state is not None:
+        state['turn'] = current_turn
+    elif not current_turn.is_empty():
+        yield current_turn
+
+
+def parse_turns(source) -> Iterator[Turn]:
+    """
+    Turni di una conversazione da uno stream binario (un file aperto in
+    'rb', un socket, stdin.buffer) o da un iterabile di righe JSONL, senza
+    file di output né messaggi a console. Per usare il parser da altri tool:
+    
+        with open('conversation.jsonl', 'rb') as f:
+            for turn in parse_turns(f):
+                print(turn.user.text if turn.user else '', len(turn.tool_results))
+    """
+    return group_turns(iter_jsonl_stream(source))
+
+
+def watch_checkpoint_path(file_path: Path) -> str:
+    """File di checkpoint della modalità --watch per un file JSONL"""
+    digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8', 'surrogateescape')).hexdigest()[:20]
+    return os.path.join(CACHE_DIR, f"watch-{digest}.json")
+
+
+def load_watch_checkpoint(file_path: Path) -> Optional[Dict[str, Any]]:
+    """Carica il checkpoint di un file JSONL, o None se manca o non è utilizzabile"""
+    try:
+        with open(watch_checkpoint_path(file_path), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(checkpoint, dict) or checkpoint.get('version') != WATCH_CHECKPOINT_VERSION:
+        return None
+    return checkpoint
+
+
+def save_watch_checkpoint(file_path: Path, checkpoint: Dict[str, Any]) -> None:
+    """Scrive il checkpoint in modo atomico; se fallisce, al riavvio si riconverte il file"""
+    checkpoint_file = watch_checkpoint_path(file_path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{checkpoint_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_file, checkpoint_file)
+    except OSError:
+        pass
+
+
+def read_tail(f, offset: int) -> str:
+    """Byte (in esadecimale) che precedono offset, l'impronta del file nel checkpoint"""
+    start = max(0, offset - CHECKPOINT_TAIL_BYTES)
+    f.seek(start)
+    return f.read(offset - start).hex()
+
+
+def manifest_path() -> str:
+    """File del manifest con le impronte dei JSONL già convertiti"""
+    return os.path.join(CACHE_DIR, 'manifest.json')
+
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """Carica il manifest (percorso sorgente -> impronta e output), vuoto se manca"""
+    try:
+        with open(manifest_path(), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def save_manifest(manifest: Dict[str, Dict[str, Any]]) -> None:
+    """Scrive il manifest in modo atomico; se fallisce, i file vengono solo riconvertiti"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{manifest_path()}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': manifest}, f)
+        os.replace(tmp_file, manifest_path())
+    except OSError:
+        pass
+
+
+def hash_file(file_path: Path) -> str:
+    """Hash del contenuto di un file, letto a blocchi"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_markdown(file_path: str) -> str:
+    """
+    Hash di un markdown su disco, confrontabile con quello calcolato mentre
+    viene scritto (dove i file di testo vanno a capo con CRLF si torna a LF)
+    """
+    if os.linesep == '\n':
+        return hash_file(file_path)
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read().replace(os.linesep.encode(), b'\n')).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """Hash di un markdown generato"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def display_path(path) -> str:
+    """Percorso da mostrare: relativo alla directory corrente se ci sta dentro, altrimenti assoluto"""
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path)
+    return path if relative == os.pardir or relative.startswith(os.pardir + os.sep) else relative
+
+
+def format_size(count: int) -> str:
+    """Dimensione di un file in forma leggibile"""
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+class JsonlWatcher:
+    """
+    Attende le modifiche ai file .jsonl di una directory. Su Linux usa
+    inotify (tramite ctypes, senza dipendenze esterne); altrove, o se
+    inotify non è disponibile, confronta dimensione e mtime dei file a
+    intervalli regolari.
+    """
+    IN_MODIFY = 0x002
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+    
+    def __init__(self, directory: Path, poll_interval: float = WATCH_POLL_INTERVAL):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.fd = self.open_inotify()
+        self.signatures = self.scan() if self.fd is None else {}
+    
+    def open_inotify(self) -> Optional[int]:
+        """Apre un descrittore inotify sulla directory, o None se non è disponibile"""
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None  # Non Linux
+        if fd < 0:
+            return None
+        mask = self.IN_MODIFY | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+            os.close(fd)  # Ad esempio limite di watch raggiunto
+            return None
+        return fd
+    
+    def scan(self) -> Dict[Path, Tuple[int, int]]:
+        """Dimensione e mtime di ogni file JSONL della directory"""
+        signatures = {}
+        for file_path in self.directory.glob('*.jsonl'):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            signatures[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+    
+    def read_events(self) -> set:
+        """Legge gli eventi inotify in coda e restituisce i file JSONL coinvolti"""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            position = 0
+            while position < len(data):
+                _, mask, _, length = struct.unpack_from('iIII', data, position)
+                name = data[position + 16:position + 16 + length].rstrip(b'\0')
+                position += 16 + length
+                if mask & self.IN_Q_OVERFLOW:
+                    # Eventi persi: si ricontrollano tutti i file
+                    changed.update(self.directory.glob('*.jsonl'))
+                elif name.endswith(b'.jsonl'):
+                    changed.add(self.directory / os.fsdecode(name))
+    
+    def wait(self) -> List[Path]:
+        """Blocca fino alla prossima modifica e restituisce i file JSONL cambiati"""
+        if self.fd is None:
+            while True:
+                time.sleep(self.poll_interval)
+                signatures = self.scan()
+                changed = [path for path, signature in signatures.items()
+                           if self.signatures.get(path) != signature]
+                self.signatures = signatures
+                if changed:
+                    return sorted(changed)
+        
+        changed = set()
+        while not changed:
+            select.select([self.fd], [], [])
+            changed = self.read_events()
+        # Claude Code scrive più righe per messaggio: raccoglile in un solo aggiornamento
+        time.sleep(WATCH_DEBOUNCE)
+        changed.update(self.read_events())
+        return sorted(changed)
+    
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
 
 class ClaudeConversationParser:
-    def __init__(self, input_path: str, output_dir: str = None, base_folder: str = "Python"):
+    def __init__(self, input_path: str, output_dir: str = None, base_folder: str = "Python",
+                 stream: bool = False, jobs: int = 1, force: bool = False, recursive: bool = False,
+                 dry_run: bool = False):
         self.input_path = Path(input_path)
         self.output_dir = output_dir  # Può essere None per usare la directory del progetto
         self.base_folder = base_folder
+        self.stream = stream  # Scrive il markdown un turno alla volta invece che tutto in memoria
+        self.jobs = jobs or os.cpu_count() or 1  # Processi per convertire una directory (0 = tutti i core)
+        self.force = force  # Riconverte e riscrive anche i file invariati
+        self.recursive = recursive  # Cerca i JSONL anche nelle sottocartelle (tutto ~/.claude/projects)
+        self.dry_run = dry_run  # Solo elenco dei file e dei percorsi di output, senza creare directory
+        self.manifest = load_manifest()
+        self.updated_sources = set()  # File del manifest aggiornati in questa esecuzione
         self.conversation_counter = {}
+        self.conversation_numbers = {}  # File -> numero _N fissato da plan_batch
+        # Fissati da plan_batch: markdown che un file ha già (dal manifest o dal
+        # checkpoint di --watch), file il cui markdown è conteso con un altro e
+        # nomi numerati già assegnati, come (directory, progetto, N)
+        self.held_outputs = {}
+        self.forced_sources = set()
+        self.reserved_names = set()
         self.name_mappings = self.load_name_mappings()
+        # Cache per cartella dei JSONL: mappature dei nomi e directory di output
+        mapping_folder = self.input_path if self.input_path.is_dir() else self.input_path.parent
+        self.folder_mappings = {mapping_folder: self.name_mappings}
+        self.output_dirs = {}  # (cartella, cwd del primo messaggio) -> directory di output
+        self.watch_states = {}  # Per ogni file in --watch: checkpoint e ultimo turno ancora aperto
     
-    def load_name_mappings(self) -> Dict[str, str]:
-        """Carica le mappature dei nomi dal file json_name_match.txt"""
+    def load_name_mappings(self, folder: Optional[Path] = None) -> Dict[str, str]:
+        """Carica le mappature dei nomi dal file json_name_match.txt (di folder, se indicata)"""
         mappings = {}
         
         # Determina il percorso del file di mappatura
-        if self.input_path.is_dir():
+        if folder is not None:
+            mapping_file = folder / "json_name_match.txt"
+        elif self.input_path.is_dir():
             mapping_file = self.input_path / "json_name_match.txt"
         else:
             mapping_file = self.input_path.parent / "json_name_match.txt"
@@ -49,18 +540,62 @@ class ClaudeConversationParser:
                         print(f"Mappatura trovata: {uuid} -> {name}")
         
         return mappings
+    
+    def get_name_mappings(self, folder: Path) -> Dict[str, str]:
+        """Mappature dei nomi per i JSONL di una cartella, caricate una volta sola"""
+        if folder not in self.folder_mappings:
+            self.folder_mappings[folder] = self.load_name_mappings(folder)
+        return self.folder_mappings[folder]
         
-    def parse_jsonl_file(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Legge un file JSONL e restituisce una lista di oggetti JSON"""
-        messages = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
+    def iter_jsonl_stream(self, stream, state: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Decodifica i messaggi da uno stream binario di righe JSONL (vedi iter_jsonl_stream)"""
+        return iter_jsonl_stream(stream, state, on_error=lambda e: print(f"Errore nel parsing della riga: {e}"))
+    
+    def iter_jsonl_lines(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Legge un file JSONL riga per riga con un buffer, invece di mapparlo:
+        la memoria resta limitata alla riga più lunga anche per file enormi
+        """
+        with open(file_path, 'rb') as f:
+            yield from self.iter_jsonl_stream(f)
+    
+    def iter_jsonl_file(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Legge un file JSONL in modo lazy: ogni riga viene decodificata solo
+        quando si chiede il messaggio successivo
+        """
+        first = True
+        with map_file(file_path) as data:
+            size = len(data)
+            start = 0
+            while start < size:
+                end = data.find(b'\n', start)
+                if end == -1:
+                    end = size
+                line_start, start = start, end + 1
+                # Dopo il primo messaggio (usato per cwd e timestamp) servono
+                # solo user e assistant: le altre righe non vengono copiate né decodificate
+                if (not first and data.find(b'"user"', line_start, end) == -1 and
+                        data.find(b'"assistant"', line_start, end) == -1):
+                    continue
+                line = data[line_start:end]
                 if line.strip():
                     try:
-                        messages.append(json.loads(line))
+                        message = json_loads(line)
                     except json.JSONDecodeError as e:
                         print(f"Errore nel parsing della riga: {e}")
-        return messages
+                        continue
+                    first = False
+                    yield message
+    
+    def parse_jsonl_file(self, file_path: Path) -> List[Dict[str, Any]]:
+        """Legge un file JSONL e restituisce una lista di oggetti JSON"""
+        return list(self.iter_jsonl_file(file_path))
+    
+    def read_first_message(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Legge solo il primo messaggio di un file JSONL (quello usato per cwd e timestamp)"""
+        with open(file_path, 'rb') as f:
+            return next(self.iter_jsonl_stream(f), None)
     
     def extract_project_name(self, cwd: str) -> str:
         """Estrae il nome del progetto dal percorso di lavoro"""
@@ -103,9 +638,10 @@ class ClaudeConversationParser:
         
         # Controlla se esiste una mappatura per questo file
         file_uuid = file_path.stem  # Estrai UUID senza estensione
-        if file_uuid in self.name_mappings:
+        name_mappings = self.get_name_mappings(file_path.parent)
+        if file_uuid in name_mappings:
             # Usa il nome mappato
-            custom_name = self.name_mappings[file_uuid]
+            custom_name = name_mappings[file_uuid]
             # Sostituisci spazi e underscore con trattini
             custom_name = custom_name.replace(' ', '-').replace('_', '-').lower()
             # Rimuovi caratteri non validi per i nomi file
@@ -119,53 +655,35 @@ class ClaudeConversationParser:
             cwd = first_msg.get('cwd', 'Unknown')
             project_name = self.extract_project_name(cwd).lower()
             
-            # Gestisci il contatore per conversazioni multiple
-            if project_name not in self.conversation_counter:
-                self.conversation_counter[project_name] = 0
-            self.conversation_counter[project_name] += 1
+            # Numero della conversazione: fissato dal pre-passaggio sui file del
+            # batch, altrimenti gestisci il contatore per conversazioni multiple
+            number = self.conversation_numbers.get(file_path)
+            if number is None:
+                number = self.next_conversation_number(project_name, self.get_output_dir(file_path, first_msg))
             
             # Genera il nome finale
-            filename = f"{date_prefix}-{project_name}_{self.conversation_counter[project_name]}.md"
+            filename = f"{date_prefix}-{project_name}_{number}.md"
         
         return filename
     
+    def next_conversation_number(self, project_name: str, output_dir: Path) -> int:
+        """
+        Numero _N della prossima conversazione di un progetto, saltando i nomi
+        che nella stessa directory appartengono già a un altro file
+        """
+        directory = os.path.abspath(output_dir)
+        number = self.conversation_counter.get(project_name, 0) + 1
+        while (directory, project_name, number) in self.reserved_names:
+            number += 1
+        self.conversation_counter[project_name] = number
+        return number
+    
     def extract_text_content(self, content: Any) -> str:
         """Estrae il contenuto testuale da diversi formati di messaggio"""
-        if isinstance(content, list):
-            text_parts = []
-            
-            for item in content:
-                if isinstance(item, dict):
-                    if item.get('type') == 'text':
-                        text = item.get('text', '').strip()
-                        if text:
-                            text_parts.append(text)
-                    elif item.get('type') == 'tool_use':
-                        # Formatta i tool use
-                        tool_name = item.get('name', 'Unknown Tool')
-                        tool_input = item.get('input', {})
-                        
-                        if tool_name == 'Read':
-                            file_path = tool_input.get('file_path', 'Unknown file')
-                            text_parts.append(f"Read file: {file_path}")
-                        elif tool_name == 'Write' or tool_name == 'Edit':
-                            file_path = tool_input.get('file_path', 'Unknown file')
-                            text_parts.append(f"{tool_name} file: {file_path}")
-                        elif tool_name == 'LS':
-                            path = tool_input.get('path', 'Unknown path')
-                            text_parts.append(f"<details>\n            <summary>Listed directory {path}</summary>\n        \n(Directory listing will appear here)\n\n</details>")
-                        else:
-                            # Per altri tool, usa un formato generico
-                            text_parts.append(f"{tool_name}: {json.dumps(tool_input, indent=2)}")
-            
-            return '\n\n'.join(text_parts) if text_parts else ''
-        elif isinstance(content, str):
-            return content
-        else:
-            return str(content)
+        return extract_text_content(content)
     
-    def convert_to_markdown(self, messages: List[Dict[str, Any]], source_filename: str = "") -> str:
-        """Converte i messaggi in formato markdown compatibile con SpecStory"""
+    def markdown_header(self, first_msg: Optional[Dict[str, Any]], source_filename: str = "") -> List[str]:
+        """Righe di intestazione SpecStory, con il titolo preso dal primo messaggio"""
         markdown_lines = []
         
         # Header SpecStory
@@ -178,8 +696,8 @@ class ClaudeConversationParser:
             markdown_lines.append("")
         
         # Titolo con timestamp dal primo messaggio
-        if messages:
-            first_timestamp = messages[0].get('timestamp', '')
+        if first_msg is not None:
+            first_timestamp = first_msg.get('timestamp', '')
             try:
                 dt = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
                 formatted_date = dt.strftime("%Y-%m-%d %H:%M:%S")
@@ -187,204 +705,289 @@ class ClaudeConversationParser:
                 formatted_date = "Unknown Date"
             
             # Usa il nome della directory di lavoro come titolo
-            cwd = messages[0].get('cwd', 'Unknown')
+            cwd = first_msg.get('cwd', 'Unknown')
             project_name = Path(cwd).name.replace(' ', '_')
             
             markdown_lines.append(f"# {project_name} ({formatted_date})")
             markdown_lines.append("")
         
-        # Raggruppa i messaggi in turni
-        turns = []
-        current_turn = {'user': None, 'assistant_messages': [], 'tool_results': []}
-        
-        for msg in messages:
-            msg_type = msg.get('type', 'unknown')
-            
-            if msg_type == 'user':
-                # Controlla se è un tool result
-                if 'toolUseResult' in msg:
-                    # È un tool result, aggiungilo al turno corrente senza creare un nuovo turno
-                    current_turn['tool_results'].append(msg['toolUseResult'])
-                else:
-                    # È un vero messaggio user, quindi inizia un nuovo turno
-                    if current_turn['user'] is not None or len(current_turn['assistant_messages']) > 0:
-                        turns.append(current_turn)
-                        current_turn = {'user': None, 'assistant_messages': [], 'tool_results': []}
-                    current_turn['user'] = msg
-                    
-            elif msg_type == 'assistant':
-                # Aggiungi TUTTI i messaggi dell'assistente (possono essere multipli)
-                current_turn['assistant_messages'].append(msg)
-        
-        # Salva l'ultimo turno
-        if current_turn['user'] is not None or len(current_turn['assistant_messages']) > 0:
-            turns.append(current_turn)
-        
-        # Converti i turni in markdown
-        for turn in turns:
-            # Estrai contenuto user
-            user_content = ""
-            if turn['user'] and 'message' in turn['user'] and 'content' in turn['user']['message']:
-                user_content = self.extract_text_content(turn['user']['message']['content'])
-            
-            # Estrai contenuto assistant (può essere multiplo)
-            assistant_content_parts = []
-            for assistant_msg in turn['assistant_messages']:
-                if 'message' in assistant_msg and 'content' in assistant_msg['message']:
-                    content = self.extract_text_content(assistant_msg['message']['content'])
-                    if content.strip():
-                        assistant_content_parts.append(content)
-            
-            assistant_content = '\n\n'.join(assistant_content_parts)
-            
-            # Controlla se è un turno di exit (da ignorare)
-            is_exit_turn = False
-            if user_content.strip():
-                # Controlla pattern di exit
-                if ('<command-name>exit</command-name>' in user_content or
-                    '<local-command-stdout>(no content)</local-command-stdout>' in user_content):
-                    is_exit_turn = True
-            
-            # Salta turni di exit
-            if is_exit_turn:
+        return markdown_lines
+    
+    def iter_turns(self, messages: Iterable[Dict[str, Any]],
+                   state: Optional[Dict[str, Any]] = None) -> Iterator[Turn]:
+        """Raggruppa i messaggi in turni (vedi group_turns)"""
+        return group_turns(messages, state)
+    
+    # Marcatori delle sezioni di un turno nel markdown generato
+    TURN_MARKERS = ('_**User**_', '_**Assistant**_')
+    
+    # Pattern che indicano solo tool reference o JSON nel testo dell'assistant
+    TOOL_PATTERNS = (
+        'Edit file:', 'Write file:', 'Read file:', 'TodoWrite:', 
+        'Bash:', 'Task:', 'Grep:', 'Glob:', 'MultiEdit:', 'LS:',
+        '<details>', '</details>', '"todos":', '"id":', '"content":', 
+        '"status":', '"priority":', '"command":', '"description":',
+        '"prompt":', '"file_path":', '"edits":', '"old_string":',
+        '"new_string":', '"path":', '"pattern":', '```'
+    )
+    
+    def is_tool_only(self, assistant_content: str) -> bool:
+        """Controlla se il testo dell'assistant contiene solo tool reference o JSON"""
+        for line in assistant_content.strip().split('\n'):
+            line_stripped = line.strip()
+            # Ignora linee vuote, separatori e JSON
+            if not line_stripped or line_stripped in ['---', '{', '}', '[', ']']:
                 continue
             
-            # Decidi se includere questo turno
-            # Salta turni dove user è vuoto E assistant ha solo tool reference
-            if not user_content.strip() and assistant_content.strip():
-                # Controlla se l'assistant ha solo tool reference
-                lines = assistant_content.strip().split('\n')
-                has_real_content = False
-                for line in lines:
-                    line_stripped = line.strip()
-                    # Ignora linee vuote, separatori e JSON
-                    if not line_stripped or line_stripped in ['---', '{', '}', '[', ']']:
-                        continue
-                    
-                    # Lista estesa di pattern che indicano solo tool reference o JSON
-                    tool_patterns = [
-                        'Edit file:', 'Write file:', 'Read file:', 'TodoWrite:', 
-                        'Bash:', 'Task:', 'Grep:', 'Glob:', 'MultiEdit:', 'LS:',
-                        '<details>', '</details>', '"todos":', '"id":', '"content":', 
-                        '"status":', '"priority":', '"command":', '"description":',
-                        '"prompt":', '"file_path":', '"edits":', '"old_string":',
-                        '"new_string":', '"path":', '"pattern":', '```'
-                    ]
-                    
-                    # Se la linea non inizia con un pattern noto E non è solo JSON
-                    is_tool_or_json = any(p in line_stripped for p in tool_patterns)
-                    is_json_line = line_stripped.startswith('"') and line_stripped.endswith(('",', '":'))
-                    
-                    if not is_tool_or_json and not is_json_line:
-                        has_real_content = True
-                        break
-                
-                if not has_real_content:
-                    # Salta questo turno completamente
-                    continue
+            # Se la linea non contiene un pattern noto E non è solo JSON
+            is_tool_or_json = any(p in line_stripped for p in self.TOOL_PATTERNS)
+            is_json_line = line_stripped.startswith('"') and line_stripped.endswith(('",', '":'))
             
-            # Aggiungi il turno
-            markdown_lines.append("_**User**_")
-            markdown_lines.append("")
-            markdown_lines.append(user_content)
-            markdown_lines.append("")
-            markdown_lines.append("---")
-            markdown_lines.append("")
-            markdown_lines.append("_**Assistant**_")
-            markdown_lines.append("")
-            
-            if assistant_content.strip():
-                markdown_lines.append(assistant_content)
-            
-            # Aggiungi tool results
-            for result in turn['tool_results']:
-                if isinstance(result, dict):
-                    if 'stdout' in result and result['stdout']:
-                        markdown_lines.append("")
-                        markdown_lines.append("```")
-                        markdown_lines.append(result['stdout'])
-                        markdown_lines.append("```")
-                    if 'stderr' in result and result['stderr']:
-                        markdown_lines.append("")
-                        markdown_lines.append("**Error:**")
-                        markdown_lines.append("```")
-                        markdown_lines.append(result['stderr'])
-                        markdown_lines.append("```")
-                elif isinstance(result, str) and result.strip():
-                    markdown_lines.append("")
-                    markdown_lines.append("```")
-                    markdown_lines.append(result)
-                    markdown_lines.append("```")
-            
-            markdown_lines.append("")
-            markdown_lines.append("---")
-            markdown_lines.append("")
+            if not is_tool_or_json and not is_json_line:
+                return False
+        return True
+    
+    def render_tool_results(self, tool_results: List[ToolResult]) -> List[str]:
+        """Righe markdown dei tool result (stdout e stderr in blocchi di codice)"""
+        markdown_lines = []
+        for result in tool_results:
+            if result.stdout:
+                markdown_lines.append("")
+                markdown_lines.append("```")
+                markdown_lines.append(result.stdout)
+                markdown_lines.append("```")
+            if result.stderr:
+                markdown_lines.append("")
+                markdown_lines.append("**Error:**")
+                markdown_lines.append("```")
+                markdown_lines.append(result.stderr)
+                markdown_lines.append("```")
+        return markdown_lines
+    
+    def render_turn(self, turn: Turn) -> Optional[List[str]]:
+        """
+        Converte un turno in righe markdown, o None se il turno va saltato
+        (turni di exit, turni fake con user vuoto e turni di soli tool)
+        """
+        # Estrai contenuto user
+        user_content = turn.user.text if turn.user is not None else ""
+        
+        # Controlla se è un turno di exit (da ignorare)
+        if user_content.strip():
+            # Controlla pattern di exit
+            if ('<command-name>exit</command-name>' in user_content or
+                '<local-command-stdout>(no content)</local-command-stdout>' in user_content):
+                return None
+        
+        # Estrai contenuto assistant (può essere multiplo)
+        assistant_content_parts = []
+        for assistant_msg in turn.assistant_messages:
+            if assistant_msg.text.strip():
+                assistant_content_parts.append(assistant_msg.text)
+        
+        assistant_content = '\n\n'.join(assistant_content_parts)
+        tool_lines = self.render_tool_results(turn.tool_results)
+        
+        # Un turno con user vuoto è fake: nel markdown la sezione va da
+        # _**User**_ al primo --- dopo _**Assistant**_ e si scarta per intero.
+        # Solo se la risposta contiene un --- il testo che lo segue resta, e
+        # allora il turno passa dalla pulizia riga per riga
+        fake_turn = not user_content.strip()
+        if fake_turn and '---' not in assistant_content and not any('---' in line for line in tool_lines):
+            return None
+        
+        # Salta turni dove user è vuoto E assistant ha solo tool reference
+        if fake_turn and assistant_content.strip() and self.is_tool_only(assistant_content):
+            return None
+        
+        # Aggiungi il turno
+        markdown_lines = []
+        markdown_lines.append("_**User**_")
+        markdown_lines.append("")
+        markdown_lines.append(user_content)
+        markdown_lines.append("")
+        markdown_lines.append("---")
+        markdown_lines.append("")
+        markdown_lines.append("_**Assistant**_")
+        markdown_lines.append("")
+        
+        if assistant_content.strip():
+            markdown_lines.append(assistant_content)
+        
+        # Aggiungi tool results
+        markdown_lines.extend(tool_lines)
         
-        return '\n'.join(markdown_lines)
+        markdown_lines.append("")
+        markdown_lines.append("---")
+        markdown_lines.append("")
+        
+        # I marcatori di turno dentro il contenuto possono formare un turno fake:
+        # in quel caso (raro) si applica la pulizia riga per riga al solo turno
+        contents = [user_content, assistant_content] + tool_lines
+        if fake_turn or any(marker in text for text in contents for marker in self.TURN_MARKERS):
+            return list(self.iter_clean_lines('\n'.join(markdown_lines).split('\n'), strip_trailing=False))
+        return markdown_lines
     
-    def clean_fake_turns(self, markdown_content: str) -> str:
-        """Seconda passata per rimuovere turni fake dal markdown generato"""
-        lines = markdown_content.split('\n')
-        cleaned_lines = []
-        i = 0
-        
-        while i < len(lines):
-            # Pattern per identificare un turno fake:
-            # _**User**_
-            # [linee vuote]
-            # ---
-            # [linee vuote]
-            # _**Assistant**_
-            
-            if (i < len(lines) and lines[i].strip() == '_**User**_'):
-                # Salva la posizione iniziale
-                start_i = i
-                i += 1
+    def iter_markdown(self, messages: Iterable[Dict[str, Any]], source_filename: str = "",
+                      stats: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """
+        Genera il markdown compatibile con SpecStory un blocco alla volta
+        (l'intestazione, poi un blocco per turno, che può contenere più righe).
+        I turni saltati non vengono mai generati; se stats è un dict, vi
+        vengono contati i turni letti ('turns') e quelli scritti ('written').
+        """
+        if stats is None:
+            stats = {}
+        stats['turns'] = stats['written'] = 0
+        
+        messages = iter(messages)
+        first_msg = next(messages, None)
+        blocks = self.markdown_header(first_msg, source_filename)
+        if first_msg is not None:
+            blocks = itertools.chain(blocks, self._iter_turn_blocks(messages, first_msg, stats))
+        
+        # Le linee vuote consecutive alla fine vengono scartate
+        blank_blocks = []
+        for block in blocks:
+            if block.strip() == '':
+                blank_blocks.append(block)
+            else:
+                yield from blank_blocks
+                blank_blocks = []
+                yield block
+    
+    def _iter_turn_blocks(self, messages: Iterator[Dict[str, Any]], first_msg: Dict[str, Any],
+                          stats: Dict[str, int]) -> Iterator[str]:
+        for turn in self.iter_turns(itertools.chain([first_msg], messages)):
+            stats['turns'] += 1
+            markdown_lines = self.render_turn(turn)
+            if markdown_lines:
+                stats['written'] += 1
+                yield from markdown_lines
+    
+    def convert_to_markdown(self, messages: Iterable[Dict[str, Any]], source_filename: str = "",
+                            stats: Optional[Dict[str, int]] = None) -> str:
+        """Converte i messaggi in formato markdown compatibile con SpecStory"""
+        return '\n'.join(self.iter_markdown(messages, source_filename, stats))
+    
+    def iter_clean_lines(self, lines: Iterable[str], strip_trailing: bool = True) -> Iterator[str]:
+        """
+        Rimuove i turni fake riga per riga: legge in avanti solo le righe vuote
+        e i separatori che servono a riconoscerli. Con strip_trailing le linee
+        vuote finali vengono scartate.
+        """
+        # Pattern per identificare un turno fake:
+        # _**User**_
+        # [linee vuote]
+        # ---
+        # [linee vuote]
+        # _**Assistant**_
+        lines = iter(lines)
+        blank_lines = []  # Righe vuote trattenute: quelle finali vanno rimosse
+        line = next(lines, None)
+        
+        while line is not None:
+            if line.strip() != '_**User**_':
+                # Linea normale, aggiungila
+                kept = [line]
+                line = next(lines, None)
+            else:
+                kept = [line]
+                line = next(lines, None)
                 
                 # Salta linee vuote dopo User
-                while i < len(lines) and lines[i].strip() == '':
-                    i += 1
+                while line is not None and line.strip() == '':
+                    kept.append(line)
+                    line = next(lines, None)
                 
                 # Se troviamo --- dopo user vuoto
-                if i < len(lines) and lines[i].strip() == '---':
-                    i += 1
+                if line is not None and line.strip() == '---':
+                    kept.append(line)
+                    line = next(lines, None)
                     
                     # Salta linee vuote dopo ---
-                    while i < len(lines) and lines[i].strip() == '':
-                        i += 1
+                    while line is not None and line.strip() == '':
+                        kept.append(line)
+                        line = next(lines, None)
                     
                     # Se troviamo _**Assistant**_ subito dopo, è un turno fake
-                    if i < len(lines) and lines[i].strip() == '_**Assistant**_':
+                    if line is not None and line.strip() == '_**Assistant**_':
                         # Questo è un turno fake! Saltiamo tutto fino al prossimo ---
-                        while i < len(lines) and lines[i].strip() != '---':
-                            i += 1
+                        while line is not None and line.strip() != '---':
+                            line = next(lines, None)
                         
                         # Salta anche il --- finale e le linee vuote
-                        if i < len(lines) and lines[i].strip() == '---':
-                            i += 1
-                            while i < len(lines) and lines[i].strip() == '':
-                                i += 1
-                        
-                        # Continua senza aggiungere nulla a cleaned_lines
-                        continue
-                    else:
-                        # Non è un fake turn, ripristina e aggiungi normalmente
-                        for j in range(start_i, i):
-                            cleaned_lines.append(lines[j])
+                        if line is not None:
+                            line = next(lines, None)
+                            while line is not None and line.strip() == '':
+                                line = next(lines, None)
+                        kept = []
+                # Altrimenti non è un turno fake: le righe lette restano e la
+                # riga corrente viene esaminata al giro successivo
+            
+            if not strip_trailing:
+                yield from kept
+                continue
+            for kept_line in kept:
+                if kept_line.strip() == '':
+                    blank_lines.append(kept_line)
                 else:
-                    # Non è il pattern che cerchiamo, aggiungi tutto
-                    for j in range(start_i, i):
-                        cleaned_lines.append(lines[j])
-            else:
-                # Linea normale, aggiungila
-                cleaned_lines.append(lines[i])
-                i += 1
-        
-        # Rimuovi linee vuote multiple consecutive alla fine
-        while cleaned_lines and cleaned_lines[-1].strip() == '':
-            cleaned_lines.pop()
-        
-        return '\n'.join(cleaned_lines)
+                    yield from blank_lines
+                    blank_lines = []
+                    yield kept_line
+    
+    def clean_fake_turns(self, markdown_content: str) -> str:
+        """
+        Rimuove i turni fake da un markdown già generato. convert_to_markdown
+        non li genera più: serve solo per ripulire file prodotti da versioni
+        precedenti del parser.
+        """
+        return '\n'.join(self.iter_clean_lines(markdown_content.split('\n')))
+    
+    def write_markdown_stream(self, messages: Iterable[Dict[str, Any]], source_filename: str,
+                              output_path: Path, previous_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scrive il markdown man mano che i turni vengono assemblati: la memoria
+        è limitata al turno più grande invece che all'intera conversazione.
+        Il file viene sostituito solo a scrittura completata, e solo se l'hash
+        del markdown è diverso da previous_hash: in quel caso il file temporaneo
+        sta nella cache, così chi osserva la cartella del markdown non vede
+        eventi per una conversazione rimasta uguale.
+        Restituisce il conteggio dei turni come iter_markdown e l'hash ('hash').
+        """
+        stats = {}
+        digest = hashlib.sha1()
+        local_tmp = output_path.with_name(f".{output_path.name}.tmp")
+        tmp_path = local_tmp
+        if previous_hash is not None:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                tmp_path = Path(CACHE_DIR) / f"stream-{os.getpid()}.md.tmp"
+            except OSError:
+                pass  # Senza cache si usa il file temporaneo accanto al markdown
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                separator = ''
+                for block in self.iter_markdown(messages, source_filename, stats):
+                    f.write(separator)
+                    f.write(block)
+                    digest.update(f"{separator}{block}".encode('utf-8'))
+                    separator = '\n'
+            stats['hash'] = digest.hexdigest()
+            if stats['hash'] != previous_hash:
+                try:
+                    os.replace(tmp_path, output_path)
+                except OSError:
+                    if tmp_path == local_tmp:
+                        raise
+                    # Cache su un altro filesystem: si copia accanto al markdown
+                    shutil.copyfile(tmp_path, local_tmp)
+                    os.replace(local_tmp, output_path)
+        finally:
+            for path in (tmp_path, local_tmp):
+                if path.exists():
+                    path.unlink()
+        return stats
     
     def get_project_path_from_cwd(self, cwd: str) -> Optional[Path]:
         """Estrae il percorso del progetto dal cwd"""
@@ -428,29 +1031,182 @@ class ClaudeConversationParser:
                 
         return None
     
+    def manifest_settings(self, file_path: Path) -> Dict[str, Optional[str]]:
+        """Opzioni da cui dipende l'output di un file, salvate nella sua voce del manifest"""
+        return {
+            'output_dir': os.path.abspath(self.output_dir) if self.output_dir else None,
+            'base_folder': self.base_folder,
+            'name': self.get_name_mappings(file_path.parent).get(file_path.stem),
+        }
+    
+    def manifest_entry_applies(self, entry: Optional[Dict[str, Any]], file_path: Path) -> bool:
+        """Controlla che una voce del manifest valga per le opzioni correnti"""
+        if not entry:
+            return False
+        try:
+            return all(entry[key] == value for key, value in self.manifest_settings(file_path).items())
+        except (KeyError, TypeError):
+            return False
+    
+    def manifest_entry(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Voce del manifest di un file, se vale ancora per le opzioni correnti
+        e il suo markdown non è rivendicato anche da un altro file
+        """
+        if os.path.abspath(file_path) in self.forced_sources:
+            return None
+        entry = self.manifest.get(os.path.abspath(file_path))
+        return entry if self.manifest_entry_applies(entry, file_path) else None
+    
+    def output_trusted(self, entry: Dict[str, Any]) -> bool:
+        """
+        Controlla che il markdown di una voce del manifest sia ancora quello
+        scritto dalla conversione: stessa dimensione e stesso mtime, oppure lo
+        stesso hash se il markdown è stato solo toccato
+        """
+        if entry['output'] is None:
+            return True
+        try:
+            stat = os.stat(entry['output'])
+            if stat.st_size != entry['md_size']:
+                return False
+            if stat.st_mtime_ns == entry.get('md_mtime_ns'):
+                return True
+            if hash_markdown(entry['output']) != entry['md_hash']:
+                return False
+            entry['md_mtime_ns'] = stat.st_mtime_ns  # Salvato con la voce, se il file risulta invariato
+            return True
+        except (KeyError, OSError):
+            return False
+    
+    def checkpoint_output(self, file_path: Path) -> Optional[str]:
+        """Markdown del checkpoint di --watch di un file, se scritto con le opzioni correnti"""
+        checkpoint = load_watch_checkpoint(file_path)
+        if checkpoint and checkpoint.get('output_dir') == self.output_dir and checkpoint.get('output'):
+            return os.path.abspath(checkpoint['output'])
+        return None
+    
+    def record_manifest(self, file_path: Path, stat: os.stat_result, digest: str,
+                        output_path: Optional[Path] = None, md_hash: Optional[str] = None) -> None:
+        """Registra nel manifest l'impronta di un file convertito e il suo output"""
+        md_stat = os.stat(output_path) if output_path else None
+        self.manifest[os.path.abspath(file_path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': digest,
+            'output': os.path.abspath(output_path) if output_path else None,
+            'md_hash': md_hash,
+            'md_size': md_stat.st_size if md_stat else None,
+            'md_mtime_ns': md_stat.st_mtime_ns if md_stat else None,
+            **self.manifest_settings(file_path),
+        }
+        self.updated_sources.add(os.path.abspath(file_path))
+    
+    def store_manifest(self) -> None:
+        """
+        Salva le voci aggiornate in questa esecuzione nel manifest su disco
+        (riletto, per non perdere quelle di altre esecuzioni), togliendo i
+        file sorgente che non esistono più
+        """
+        manifest = load_manifest()
+        manifest.update((key, self.manifest[key]) for key in self.updated_sources if key in self.manifest)
+        for key in [key for key in manifest if not os.path.exists(key)]:
+            del manifest[key]
+        save_manifest(manifest)
+        self.updated_sources.clear()
+    
     def process_file(self, file_path: Path) -> None:
         """Processa un singolo file JSONL"""
         print(f"Processing: {file_path}")
         
-        messages = self.parse_jsonl_file(file_path)
-        if not messages:
+        # Salta i file con la stessa impronta dell'ultima conversione: dimensione
+        # e mtime, oppure lo stesso contenuto se il file è stato solo toccato
+        stat = os.stat(file_path)
+        entry = self.manifest_entry(file_path)
+        # Il markdown su disco deve essere ancora quello della conversione registrata
+        trusted = entry is not None and self.output_trusted(entry)
+        digest = None
+        if trusted and not self.force:
+            if (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+                digest = hash_file(file_path)
+            if digest is None or digest == entry['hash']:
+                entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                self.updated_sources.add(os.path.abspath(file_path))
+                print(f"Invariato dall'ultima conversione: {entry['output'] or file_path}")
+                return
+        if digest is None:
+            digest = hash_file(file_path)
+        
+        # I messaggi vengono decodificati mentre si assemblano i turni, che
+        # tengono solo il testo: le voci JSON non restano in memoria
+        if self.stream:
+            messages = self.iter_jsonl_lines(file_path)
+        else:
+            messages = self.iter_jsonl_file(file_path)
+        first_msg = next(messages, None)
+        messages = itertools.chain([first_msg], messages)
+        if first_msg is None:
             print(f"Nessun messaggio trovato in {file_path}")
+            self.record_manifest(file_path, stat, digest)
             return
         
-        # Passa anche il nome del file sorgente
-        markdown_content = self.convert_to_markdown(messages, file_path.name)
+        output = self.held_outputs.get(os.path.abspath(file_path)) or (entry['output'] if entry else None)
+        if output:
+            # Stesso file della conversione precedente, anche se è cambiata la data del JSONL
+            output_path = Path(output)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            output_path = self.get_output_path(file_path, first_msg)
+        # Un markdown identico a quello già su disco non viene riscritto
+        previous_hash = None
+        if trusted and not self.force and entry['output'] == os.path.abspath(output_path):
+            previous_hash = entry['md_hash']
         
-        # Seconda passata per rimuovere turni fake
-        cleaned_content = self.clean_fake_turns(markdown_content)
+        if self.stream:
+            # Conversione e scrittura un turno alla volta
+            stats = self.write_markdown_stream(messages, file_path.name, output_path, previous_hash)
+        else:
+            # Passa anche il nome del file sorgente; i turni fake non vengono generati
+            stats = {}
+            markdown_content = self.convert_to_markdown(messages, file_path.name, stats)
+            stats['hash'] = hash_text(markdown_content)
+            
+            # Scrivi il file markdown
+            if stats['hash'] != previous_hash:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(markdown_content)
+        self.record_manifest(file_path, stat, digest, output_path, stats['hash'])
         
+        if stats['hash'] == previous_hash:
+            print(f"Markdown invariato, non riscritto: {output_path}")
+        else:
+            print(f"Output salvato in: {output_path}")
+        print(f"Turni ridotti da {stats['turns']} a {stats['written']} scartando exit, turni fake e soli tool")
+    
+    def get_output_path(self, file_path: Path, first_msg: Dict[str, Any]) -> Path:
+        """Percorso del markdown di un file JSONL, creando la directory di output"""
         # Genera il nome del file nel formato SpecStory
-        output_filename = self.generate_filename(messages, file_path.stem, file_path)
-        
-        # Determina la directory di output
+        output_filename = self.generate_filename([first_msg], file_path.stem, file_path)
+        return self.get_output_dir(file_path, first_msg) / output_filename
+    
+    def get_output_dir(self, file_path: Path, first_msg: Dict[str, Any]) -> Path:
+        """
+        Directory di output di un file JSONL, creata se serve. Dipende solo
+        dalla cartella del file e dal cwd del primo messaggio, quindi viene
+        risolta e creata una volta sola per progetto
+        """
+        key = (file_path.parent, first_msg.get('cwd'))
+        if key not in self.output_dirs:
+            self.output_dirs[key] = self.resolve_output_dir(file_path, first_msg)
+        return self.output_dirs[key]
+    
+    def resolve_output_dir(self, file_path: Path, first_msg: Dict[str, Any]) -> Path:
+        """Determina la directory di output di un file JSONL e la crea (tranne che in --list)"""
         if self.output_dir:
             # Usa la directory specificata dall'utente
             output_dir = Path(self.output_dir)
-            output_dir.mkdir(exist_ok=True)
+            if not self.dry_run:
+                output_dir.mkdir(exist_ok=True)
         else:
             # Prima prova a estrarre il percorso dal nome della cartella JSONL
             project_path = self.get_project_path_from_jsonl_path(file_path)
@@ -458,51 +1214,411 @@ class ClaudeConversationParser:
             
             # Se non funziona, prova con il cwd dal JSON
             if not project_path or not project_path.exists():
-                if messages and 'cwd' in messages[0]:
-                    cwd = messages[0]['cwd']
+                if 'cwd' in first_msg:
+                    cwd = first_msg['cwd']
                     print(f"Debug: CWD dal JSON: {cwd}")
                     project_path = self.get_project_path_from_cwd(cwd)
             
             if project_path and project_path.exists():
                 # Crea la struttura .specstory/history nel progetto
                 output_dir = project_path / '.specstory' / 'history'
-                output_dir.mkdir(parents=True, exist_ok=True)
+                if not self.dry_run:
+                    output_dir.mkdir(parents=True, exist_ok=True)
                 print(f"Salvando in: {output_dir}")
             else:
                 # Fallback alla directory di output di default
                 output_dir = Path('output')
-                output_dir.mkdir(exist_ok=True)
+                if not self.dry_run:
+                    output_dir.mkdir(exist_ok=True)
                 print(f"Warning: Impossibile determinare il percorso del progetto, uso directory di default")
                 if project_path:
                     print(f"Debug: Il percorso {project_path} non esiste")
         
-        output_path = output_dir / output_filename
+        return output_dir
+    
+    def plan_batch(self, files: List[Path], watch: bool = False) -> List[Path]:
+        """
+        Pre-passaggio sui file di un batch, in ordine di percorso: legge solo
+        il primo messaggio di ciascuno, fissa il numero _N delle conversazioni
+        senza nome personalizzato, così i nomi non dipendono dall'ordine (o dal
+        processo) in cui i file vengono convertiti, e risolve le directory di
+        output. Restituisce i file raggruppati per directory di output.
+        
+        Un file che ha già un markdown (voce del manifest o checkpoint di
+        --watch, preferito con watch) lo mantiene, e i numeri nuovi saltano i
+        nomi già assegnati nella stessa directory. Un markdown rivendicato da
+        più file non vale per nessuno: quei file vengono riconvertiti con un
+        nome nuovo, invece di sovrascriversi a vicenda.
+        """
+        files = sorted(files)
+        claims = {}  # Markdown -> file che lo rivendicano
+        for source, entry in self.manifest.items():
+            output = entry.get('output') if isinstance(entry, dict) else None
+            if output and os.path.exists(source):
+                claims.setdefault(output, set()).add(source)
+        owned = {}
+        for file_path in files:
+            key = os.path.abspath(file_path)
+            owned[key] = []
+            entry = self.manifest.get(key)
+            if self.manifest_entry_applies(entry, file_path) and entry['output']:
+                owned[key].append(entry['output'])
+            output = self.checkpoint_output(file_path)
+            if output:
+                claims.setdefault(output, set()).add(key)
+                owned[key].insert(0 if watch else len(owned[key]), output)
+        
+        contested = {output for output, sources in claims.items() if len(sources) > 1}
+        for key, outputs in owned.items():
+            if any(output in contested for output in outputs):
+                self.forced_sources.add(key)
+            outputs = [output for output in outputs if output not in contested]
+            if outputs:
+                self.held_outputs[key] = outputs[0]
+        for output in claims:
+            match = NUMBERED_NAME.match(os.path.basename(output))
+            if match and output not in contested:
+                self.reserved_names.add((os.path.dirname(output), match.group(1), int(match.group(2))))
+        
+        output_dirs = {}
+        for file_path in files:
+            first_msg = self.read_first_message(file_path)
+            if first_msg is None:
+                continue  # Nessun output per questo file
+            output_dirs[file_path] = str(self.get_output_dir(file_path, first_msg))
+            if os.path.abspath(file_path) in self.held_outputs:
+                continue
+            if file_path.stem in self.get_name_mappings(file_path.parent):
+                continue
+            project_name = self.extract_project_name(first_msg.get('cwd', 'Unknown')).lower()
+            self.conversation_numbers[file_path] = self.next_conversation_number(project_name, output_dirs[file_path])
+        return sorted(files, key=lambda file_path: (output_dirs.get(file_path, ''), file_path))
+    
+    def find_jsonl_files(self) -> List[Path]:
+        """File JSONL della directory di input (e delle sottocartelle con --recursive)"""
+        pattern = '**/*.jsonl' if self.recursive else '*.jsonl'
+        return sorted(path for path in self.input_path.glob(pattern) if path.is_file())
+    
+    def describe_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Conversione prevista per un file JSONL, leggendo solo le prime righe:
+        percorso di output, progetto, primo timestamp, dimensione e se il file
+        è invariato dall'ultima conversione. None se non contiene messaggi.
+        """
+        with open(file_path, 'rb') as f:
+            messages = self.iter_jsonl_stream(f)
+            first_msg = next(messages, None)
+            if first_msg is None:
+                return None
+            timestamp = None
+            for msg in itertools.islice(itertools.chain([first_msg], messages), HEADER_MESSAGES):
+                if msg.get('timestamp'):
+                    timestamp = msg['timestamp']
+                    break
+        
+        stat = os.stat(file_path)
+        entry = self.manifest_entry(file_path)
+        output_path = self.held_outputs.get(os.path.abspath(file_path)) or (entry['output'] if entry else None)
+        if not output_path:
+            output_path = os.path.abspath(self.get_output_path(file_path, first_msg))
+        # Con dimensione e mtime diversi il contenuto potrebbe essere lo stesso,
+        # ma per saperlo bisognerebbe leggere tutto il file
+        unchanged = (entry is not None and not self.force and entry['output'] == output_path
+                     and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+                     and self.output_trusted(entry))
+        return {
+            'source': str(file_path),
+            'output': output_path,
+            'project': self.extract_project_name(first_msg.get('cwd', 'Unknown')),
+            'first_timestamp': timestamp,
+            'size': stat.st_size,
+            'unchanged': unchanged,
+        }
+    
+    def list_conversations(self) -> None:
+        """
+        Elenca le conversazioni con il markdown che verrebbe generato per
+        ciascuna, senza convertire nulla né creare directory
+        """
+        if self.input_path.is_file():
+            files = [self.input_path]
+        elif self.input_path.is_dir():
+            files = self.find_jsonl_files()
+        else:
+            print(f"Path non valido: {self.input_path}")
+            return
+        if not files:
+            print(f"Nessun file JSONL trovato in {self.input_path}")
+            return
+        
+        # Nomi e percorsi si calcolano come nella conversione, senza i suoi messaggi di debug
+        with redirect_stdout(io.StringIO()):
+            files = self.plan_batch(files)
+            conversations = [(file_path, self.describe_file(file_path)) for file_path in files]
         
-        # Scrivi il file markdown pulito
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(cleaned_content)
+        total_size = 0
+        to_convert = 0
+        for file_path, info in conversations:
+            if info is None:
+                print(f"{display_path(file_path)}\n    nessun messaggio, nessun output")
+                continue
+            total_size += info['size']
+            to_convert += not info['unchanged']
+            first_date = 'data sconosciuta'
+            if info['first_timestamp']:
+                try:
+                    dt = datetime.fromisoformat(info['first_timestamp'].replace('Z', '+00:00'))
+                    first_date = dt.strftime("%Y-%m-%d %H:%M:%S")
+                except (ValueError, AttributeError):
+                    pass
+            status = 'invariato' if info['unchanged'] else 'da convertire'
+            print(f"{display_path(file_path)}\n    -> {display_path(info['output'])}\n"
+                  f"    {info['project']}, {first_date}, {format_size(info['size'])}, {status}")
         
-        # Conta i turni prima e dopo la pulizia per debug
-        turns_before = markdown_content.count('_**User**_')
-        turns_after = cleaned_content.count('_**User**_')
+        listed = sum(1 for _, info in conversations if info is not None)
+        print(f"Conversazioni: {listed} ({format_size(total_size)}), da convertire: {to_convert}")
+    
+    def process_files_parallel(self, files: List[Path]) -> None:
+        """
+        Converte i file in un pool di processi. Ogni worker restituisce quello
+        che ha stampato e l'output viene mostrato nell'ordine dei file, quindi
+        il risultato è identico all'elaborazione seriale
+        """
+        from concurrent.futures import ProcessPoolExecutor
         
-        print(f"Output salvato in: {output_path}")
-        print(f"Turni ridotti da {turns_before} a {turns_after} dopo la seconda pulizia")
+        sizes = {}
+        for file_path in files:
+            try:
+                sizes[file_path] = os.path.getsize(file_path)
+            except OSError:
+                sizes[file_path] = 0
+        
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(files)),
+                                 initializer=_init_worker, initargs=(self,)) as pool:
+            # I file più grandi partono per primi, così la conversione non finisce
+            # con un solo processo ancora al lavoro su un file enorme
+            futures = {file_path: pool.submit(_process_file_in_worker, file_path)
+                       for file_path in sorted(files, key=lambda file_path: -sizes[file_path])}
+            for file_path in files:
+                output, entry = futures[file_path].result()
+                print(output, end='')
+                if entry is not None:
+                    self.manifest[os.path.abspath(file_path)] = entry
+                    self.updated_sources.add(os.path.abspath(file_path))
     
     def process_directory(self) -> None:
         """Processa tutti i file JSONL nella directory di input"""
         if self.input_path.is_file():
+            self.plan_batch([self.input_path])
             self.process_file(self.input_path)
+            self.store_manifest()
         elif self.input_path.is_dir():
-            jsonl_files = list(self.input_path.glob('*.jsonl'))
+            jsonl_files = self.find_jsonl_files()
             if not jsonl_files:
                 print(f"Nessun file JSONL trovato in {self.input_path}")
                 return
             
-            for file_path in jsonl_files:
-                self.process_file(file_path)
+            jsonl_files = self.plan_batch(jsonl_files)
+            try:
+                if self.jobs > 1 and len(jsonl_files) > 1:
+                    self.process_files_parallel(jsonl_files)
+                else:
+                    for file_path in jsonl_files:
+                        self.process_file(file_path)
+            finally:
+                # Anche se un file fallisce, quelli già convertiti restano registrati
+                self.store_manifest()
+        else:
+            print(f"Path non valido: {self.input_path}")
+    
+    def write_blocks(self, f, blocks: Iterable[str], blanks: List[str]) -> None:
+        """
+        Accoda blocchi a un markdown già iniziato con lo stesso risultato del
+        join di iter_markdown: i blocchi vuoti restano in blanks finché non ne
+        arriva uno non vuoto, così quelli finali non vengono scritti
+        """
+        for block in blocks:
+            if block.strip() == '':
+                blanks.append(block)
+            else:
+                for blank in blanks:
+                    f.write('\n')
+                    f.write(blank)
+                blanks.clear()
+                f.write('\n')
+                f.write(block)
+    
+    def watch_checkpoint_matches(self, checkpoint: Optional[Dict[str, Any]], stat: os.stat_result, f) -> bool:
+        """Controlla che il JSONL e il suo markdown siano quelli descritti dal checkpoint"""
+        if not checkpoint:
+            return False
+        try:
+            if checkpoint['inode'] != stat.st_ino or checkpoint['device'] != stat.st_dev:
+                return False  # File sostituito
+            if checkpoint['offset'] > stat.st_size or read_tail(f, checkpoint['offset']) != checkpoint['tail']:
+                return False  # File troncato o riscritto
+            if checkpoint['output_dir'] != self.output_dir:
+                return False
+            # Il markdown non deve essere stato modificato o rimosso nel frattempo
+            return not checkpoint['header'] or os.path.getsize(checkpoint['output']) == checkpoint['md_size']
+        except (KeyError, TypeError, OSError):
+            return False
+    
+    def update_markdown(self, file_path: Path) -> None:
+        """
+        Aggiorna il markdown di un file JSONL leggendo solo le righe aggiunte
+        dall'aggiornamento precedente: i turni chiusi vengono accodati e solo
+        l'ultimo, che può ancora crescere, viene riscritto. Il checkpoint
+        (offset letto, inizio dell'ultimo turno, parte definitiva del
+        markdown) resta su disco, così dopo un riavvio si rilegge solo
+        l'ultimo turno.
+        """
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self.watch_states.pop(key, None)  # File rimosso
+            return
+        watch_state = self.watch_states.get(key)
+        if watch_state is None:
+            # Un file il cui markdown è conteso con un altro riparte da zero con un nome nuovo
+            checkpoint = None if key in self.forced_sources else load_watch_checkpoint(file_path)
+            self.forced_sources.discard(key)
+            watch_state = {'checkpoint': checkpoint, 'turn': None}
+        
+        with open(file_path, 'rb') as f:
+            checkpoint = watch_state['checkpoint']
+            if not self.watch_checkpoint_matches(checkpoint, stat, f):
+                # Primo passaggio, file riscritto o markdown modificato: si riconverte
+                # da capo, mantenendo se possibile lo stesso file di output
+                output = None
+                if checkpoint and checkpoint.get('output_dir') == self.output_dir:
+                    output = checkpoint.get('output')
+                output = output or self.held_outputs.get(key)
+                checkpoint = {
+                    'version': WATCH_CHECKPOINT_VERSION, 'inode': stat.st_ino, 'device': stat.st_dev,
+                    'offset': 0, 'tail': '', 'turn_offset': 0, 'header': False,
+                    'output': output, 'output_dir': self.output_dir,
+                    'md_offset': 0, 'md_size': 0, 'blanks': [], 'turns': 0, 'written': 0,
+                }
+                watch_state = {'checkpoint': checkpoint, 'turn': None}
+            elif checkpoint['offset'] == stat.st_size:
+                self.watch_states[key] = watch_state
+                return  # Nessuna riga nuova
+            
+            # L'ultimo turno è in memoria; dopo un riavvio si rilegge dal suo inizio
+            start = checkpoint['offset'] if watch_state['turn'] is not None else checkpoint['turn_offset']
+            read = {'offset': start, 'first': not checkpoint['header']}
+            f.seek(start)
+            messages = self.iter_jsonl_stream(f, read)
+            blanks = list(checkpoint['blanks'])
+            
+            if checkpoint['header']:
+                md = open(checkpoint['output'], 'r+', encoding='utf-8')
+                md.seek(checkpoint['md_offset'])
+                md.truncate()
+            else:
+                first_msg = next(messages, None)
+                if first_msg is None:
+                    # Ancora nessun messaggio completo
+                    checkpoint.update(offset=read['offset'], turn_offset=read['offset'],
+                                      tail=read_tail(f, read['offset']))
+                    save_watch_checkpoint(file_path, checkpoint)
+                    self.watch_states[key] = watch_state
+                    return
+                if checkpoint['output']:
+                    output_path = Path(checkpoint['output'])
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                else:
+                    output_path = self.get_output_path(file_path, first_msg)
+                md = open(output_path, 'w', encoding='utf-8')
+                header = self.markdown_header(first_msg, file_path.name)
+                md.write(header[0])
+                self.write_blocks(md, header[1:], blanks)
+                messages = itertools.chain([first_msg], messages)
+                checkpoint.update(header=True, output=str(output_path))
+            
+            turns = {'turn': watch_state['turn']}
+            with md:
+                for turn in self.iter_turns(messages, turns):
+                    # Un turno si chiude quando ne inizia un altro: da lì riparte la rilettura
+                    checkpoint['turn_offset'] = read['line']
+                    checkpoint['turns'] += 1
+                    markdown_lines = self.render_turn(turn)
+                    if markdown_lines:
+                        checkpoint['written'] += 1
+                        self.write_blocks(md, markdown_lines, blanks)
+                checkpoint.update(md_offset=md.tell(), blanks=blanks)
+                
+                # L'ultimo turno viene scritto dopo la parte definitiva e
+                # sostituito al prossimo aggiornamento
+                stats = {'turns': checkpoint['turns'], 'written': checkpoint['written']}
+                last_turn = turns['turn']
+                if not last_turn.is_empty():
+                    stats['turns'] += 1
+                    markdown_lines = self.render_turn(last_turn)
+                    if markdown_lines:
+                        stats['written'] += 1
+                        self.write_blocks(md, markdown_lines, list(blanks))
+                checkpoint['md_size'] = md.tell()
+            
+            checkpoint.update(offset=read['offset'], tail=read_tail(f, read['offset']))
+        
+        save_watch_checkpoint(file_path, checkpoint)
+        watch_state['turn'] = last_turn
+        self.watch_states[key] = watch_state
+        print(f"Aggiornato: {checkpoint['output']} ({read['offset'] - start} byte letti, "
+              f"{stats['written']} turni su {stats['turns']})")
+    
+    def watch(self) -> None:
+        """
+        Converte i file JSONL e resta in ascolto: a ogni modifica vengono
+        letti solo i messaggi aggiunti e riscritti solo gli ultimi turni del
+        markdown. Si interrompe con Ctrl+C.
+        """
+        if self.input_path.is_file():
+            directory, only = self.input_path.parent, self.input_path
+        elif self.input_path.is_dir():
+            directory, only = self.input_path, None
         else:
             print(f"Path non valido: {self.input_path}")
+            return
+        
+        watcher = JsonlWatcher(directory)
+        mode = 'inotify' if watcher.fd is not None else f"controllo ogni {watcher.poll_interval}s"
+        print(f"In ascolto su {directory} ({mode}), Ctrl+C per uscire")
+        try:
+            # I file nuovi vengono numerati dopo quelli esistenti
+            changed = self.plan_batch([only] if only else sorted(directory.glob('*.jsonl')), watch=True)
+            while True:
+                for file_path in changed:
+                    if only is None or file_path == only:
+                        self.update_markdown(file_path)
+                changed = watcher.wait()
+        except KeyboardInterrupt:
+            print("Watch interrotto")
+        finally:
+            watcher.close()
+
+
+# Parser del processo worker in process_files_parallel
+_WORKER_PARSER = None
+
+
+def _init_worker(conv_parser: ClaudeConversationParser) -> None:
+    global _WORKER_PARSER
+    _WORKER_PARSER = conv_parser
+
+
+def _process_file_in_worker(file_path: Path) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Converte un file nel processo worker e restituisce quello che ha
+    stampato e la sua voce del manifest
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        _WORKER_PARSER.process_file(file_path)
+    return output.getvalue(), _WORKER_PARSER.manifest.get(os.path.abspath(file_path))
 
 
 def main():
@@ -523,12 +1639,56 @@ def main():
         default='Python',
         help='Nome della cartella base per identificare i progetti (default: Python)'
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Converte un turno alla volta, con memoria limitata al turno più grande'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Processi per convertire i file di una directory in parallelo (0 = tutti i core, default: 1)'
+    )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Riconverte e riscrive anche i file invariati dall\'ultima esecuzione'
+    )
+    parser.add_argument(
+        '-r', '--recursive',
+        action='store_true',
+        help='Converte anche i JSONL delle sottocartelle (ad esempio tutto ~/.claude/projects)'
+    )
+    parser.add_argument(
+        '--list', '--dry-run',
+        dest='dry_run',
+        action='store_true',
+        help='Elenca le conversazioni e dove verrebbero salvate, leggendo solo le prime righe dei file'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Resta in ascolto e aggiorna i markdown leggendo solo i messaggi aggiunti'
+    )
     
     args = parser.parse_args()
+    if args.watch and args.recursive:
+        parser.error("--watch controlla una sola cartella e non si può usare con --recursive")
+    if args.watch and args.dry_run:
+        parser.error("--list non converte nulla e non si può usare con --watch")
+    if args.jobs < 0:
+        parser.error("--jobs vuole un numero di processi, oppure 0 per usare tutti i core")
     
     # Crea il parser e processa i file
-    conv_parser = ClaudeConversationParser(args.input_path, args.output, args.base_folder)
-    conv_parser.process_directory()
+    conv_parser = ClaudeConversationParser(args.input_path, args.output, args.base_folder, args.stream,
+                                           args.jobs, args.force, args.recursive, args.dry_run)
+    if args.dry_run:
+        conv_parser.list_conversations()
+    elif args.watch:
+        conv_parser.watch()
+    else:
+        conv_parser.process_directory()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Transcript Decoding Benchmark
+
+Compares the JSON backends (stdlib json and, when installed, orjson and
+msgspec) on a synthetic transcript, for the status line's full forward scan
+(with and without the raw-bytes pre-filter that skips other sessions' lines),
+its backwards usage lookup and the parser's JSONL loading. Results are
+printed as a table and can be written as JSON.
+
+Usage:
+    python bench_decode.py --size 50M --other-sessions 0.3 --json decode.json
+
+Author: Russo Davide (The DaveEloper)
+Email: vibecoding@pcok.it
+Project: ChatTokener Suite
+Component: VAA Bonus - Status Line
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_transcript import SESSION_ID, parse_size, write_transcript
+
+STATUS_LINE_DIR = Path(__file__).resolve().parent.parent
+PARSER_SCRIPT = STATUS_LINE_DIR.parent / 'Parser' / 'claude_parser_v2.py'
+
+BACKENDS = ('json', 'orjson', 'msgspec')
+
+
+def load_module(name, path):
+    """Import a script by path."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_of(func, runs):
+    """Run func N times and return (min, median) wall time in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(min(timings), 2), round(statistics.median(timings), 2)
+
+
+def bench_status_line(status_line, transcript, runs, prefilter, total_lines):
+    """
+    Time a cold full scan of the transcript, as after a status line restart.
+    Without the prefilter no session marker is used, which also disables the
+    session index, so every line is decoded.
+    """
+    session_marker = status_line._session_marker
+    if not prefilter:
+        status_line._session_marker = lambda session_id: None
+    lines_parsed = []
+
+    def full_scan():
+        cache_dir = tempfile.mkdtemp(prefix='status_line_bench_')
+        status_line.CACHE_DIR = cache_dir
+        status_line._SCAN_CACHE.clear()
+        status_line._SCAN_LOCKS.clear()
+        status_line._SESSION_INDEXES.clear()
+        status_line._PROFILE = {"segments": {}, "scans": []}
+        status_line.scan_transcript(transcript, SESSION_ID)
+        lines_parsed.append(status_line._PROFILE["scans"][0]["lines_parsed"])
+        status_line._PROFILE = None
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    try:
+        best_ms, median_ms = best_of(full_scan, runs)
+    finally:
+        status_line._session_marker = session_marker
+    if not prefilter:
+        assert lines_parsed[-1] == total_lines, f"decoded {lines_parsed[-1]} of {total_lines} lines without the prefilter"
+    return {"min_ms": best_ms, "p50_ms": median_ms, "lines_decoded": lines_parsed[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON backends on transcript decoding')
+    parser.add_argument('--size', default='20M', help='Synthetic transcript size, e.g. 500K, 20M (default: 20M)')
+    parser.add_argument('--other-sessions', type=float, default=0.3,
+                        help='Fraction of turns from another session (default: 0.3)')
+    parser.add_argument('-n', '--runs', type=int, default=5, help='Runs per measurement (default: 5)')
+    parser.add_argument('--transcript', default=None, help='Use this transcript instead of a synthetic one')
+    parser.add_argument('--json', default=None, help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='decode_bench_')
+    transcript = args.transcript
+    if not transcript:
+        transcript = os.path.join(work_dir, 'synthetic.jsonl')
+        write_transcript(transcript, parse_size(args.size), args.other_sessions)
+
+    status_line = load_module('main_status_line', STATUS_LINE_DIR / 'main_status_line.py')
+    claude_parser = load_module('claude_parser_v2', PARSER_SCRIPT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        conversation_parser = claude_parser.ClaudeConversationParser(transcript)
+
+    with open(transcript, 'rb') as f:
+        total_lines = sum(1 for _ in f)
+    results = {
+        "python_version": sys.version.split()[0],
+        "transcript_bytes": os.path.getsize(transcript),
+        "transcript_lines": total_lines,
+        "backends": {},
+    }
+    for backend in BACKENDS:
+        if status_line.set_json_backend(backend) != backend:
+            continue  # Not installed
+        claude_parser.set_json_backend(backend)
+
+        def parse_file():
+            with contextlib.redirect_stdout(io.StringIO()):
+                conversation_parser.parse_jsonl_file(Path(transcript))
+
+        tail_min, tail_p50 = best_of(lambda: status_line.find_last_usage(transcript, SESSION_ID), args.runs)
+        parse_min, parse_p50 = best_of(parse_file, args.runs)
+        results["backends"][backend] = {
+            "scan": bench_status_line(status_line, transcript, args.runs, prefilter=True, total_lines=total_lines),
+            "scan_no_prefilter": bench_status_line(status_line, transcript, args.runs, prefilter=False, total_lines=total_lines),
+            "tail": {"min_ms": tail_min, "p50_ms": tail_p50},
+            "parser": {"min_ms": parse_min, "p50_ms": parse_p50},
+        }
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Transcript: {results['transcript_bytes'] / 1024 / 1024:.1f} MB, {total_lines} lines")
+    print(f"{'backend':<9} {'scan':>10} {'no filter':>10} {'decoded':>9} {'tail':>8} {'parser':>10}   (best of {args.runs}, ms)")
+    for backend, timing in results["backends"].items():
+        print(f"{backend:<9} {timing['scan']['min_ms']:>10.1f} {timing['scan_no_prefilter']['min_ms']:>10.1f} "
+              f"{timing['scan']['lines_decoded']:>9} {timing['tail']['min_ms']:>8.2f} {timing['parser']['min_ms']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
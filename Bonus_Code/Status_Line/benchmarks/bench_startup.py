@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for the Status Line
+
+Measures what a single status line refresh costs from a cold process:
+an `-X importtime` breakdown of the status line module and end-to-end wall
+time over N invocations of each entry point (the script itself, the thin
+client and, if available, `uv run --script`). Results are printed as a table
+and can be written as JSON to track regressions.
+
+Usage:
+    python bench_startup.py -n 30 --json startup.json
+
+Author: Russo Davide (The DaveEloper)
+Email: vibecoding@pcok.it
+Project: ChatTokener Suite
+Component: VAA Bonus - Status Line
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+STATUS_LINE_DIR = Path(__file__).resolve().parent.parent
+MAIN_SCRIPT = STATUS_LINE_DIR / 'main_status_line.py'
+CLIENT_SCRIPT = STATUS_LINE_DIR / 'status_line_client.py'
+
+DEFAULT_PAYLOAD = {
+    "session_id": "00000000-0000-0000-0000-000000000000",
+    "transcript_path": "",
+    "model": {"id": "claude-sonnet-4", "display_name": "Sonnet 4"},
+    "cost": {"total_cost_usd": 0.42},
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def import_time_breakdown(top=15):
+    """Run `python -X importtime` on the status line module and summarise it."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main_status_line'],
+        cwd=STATUS_LINE_DIR,
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            })
+        except ValueError:
+            continue
+    total_us = sum(m["cumulative_us"] for m in modules if m["depth"] == 0)
+    return {
+        "total_us": total_us,
+        "status_line_us": next((m["cumulative_us"] for m in modules if m["module"] == 'main_status_line'), None),
+        "top_self": sorted(modules, key=lambda m: m["self_us"], reverse=True)[:top],
+    }
+
+
+def time_invocations(command, payload, runs, env):
+    """Run a command N times with the payload on stdin and time each run."""
+    timings = []
+    output = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, input=payload, capture_output=True, text=True, env=env, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+        output = result.stdout.strip()
+    return {
+        "runs": runs,
+        "min_ms": round(min(timings), 2),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+        "output": output,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark status line startup time')
+    parser.add_argument('-n', '--runs', type=int, default=20, help='Invocations per entry point (default: 20)')
+    parser.add_argument('--payload', default=None, help='JSON file to use as stdin (default: a minimal payload)')
+    parser.add_argument('--json', default=None, help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.payload:
+        payload = Path(args.payload).read_text(encoding='utf-8')
+    else:
+        payload = json.dumps(DEFAULT_PAYLOAD)
+
+    # Isolated cache dir and no daemon, so every run measures a cold start
+    cache_dir = tempfile.mkdtemp(prefix='status_line_bench_')
+    env = dict(os.environ, STATUS_LINE_CACHE_DIR=cache_dir,
+               STATUS_LINE_SOCKET=os.path.join(cache_dir, 'no-daemon.sock'))
+
+    entry_points = {
+        "python": [sys.executable, str(MAIN_SCRIPT)],
+        "client": [sys.executable, str(CLIENT_SCRIPT)],
+        "python_bare": [sys.executable, '-I', '-S', str(CLIENT_SCRIPT)],
+    }
+    if shutil.which('uv'):
+        entry_points["uv"] = ['uv', 'run', '--script', str(MAIN_SCRIPT)]
+
+    # Warm up the bytecode cache and the OS page cache once
+    subprocess.run(entry_points["client"], input=payload, capture_output=True, text=True, env=env, check=False)
+
+    results = {
+        "python_version": sys.version.split()[0],
+        "platform": sys.platform,
+        "bytecode_cache": not os.environ.get('PYTHONDONTWRITEBYTECODE'),
+        "import_time": import_time_breakdown(),
+        "entry_points": {
+            name: time_invocations(command, payload, args.runs, env)
+            for name, command in entry_points.items()
+        },
+    }
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if not results["bytecode_cache"]:
+        print("Warning: PYTHONDONTWRITEBYTECODE is set, every run recompiles the module\n")
+    imports = results["import_time"]
+    print(f"Import time: {imports['total_us'] / 1000:.1f} ms total, "
+          f"main_status_line {(imports['status_line_us'] or 0) / 1000:.1f} ms")
+    for module in imports["top_self"][:10]:
+        print(f"  {module['self_us'] / 1000:7.2f} ms  {module['module']}")
+    print()
+    print(f"{'entry point':<12} {'min':>8} {'p50':>8} {'p95':>8} {'mean':>8}")
+    for name, timing in results["entry_points"].items():
+        print(f"{name:<12} {timing['min_ms']:>8.2f} {timing['p50_ms']:>8.2f} "
+              f"{timing['p95_ms']:>8.2f} {timing['mean_ms']:>8.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
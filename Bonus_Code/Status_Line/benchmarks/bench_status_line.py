@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Status Line Render Benchmark
+
+Drives generate_status_line on synthetic transcripts from 100 KB up to 1 GB
+(mixed user and assistant turns, tool results, several resumed sessions and
+oversized lines), with the same stdin payload Claude Code sends. For each
+size it measures three scenarios, each in its own process:
+
+    cold     first render with an empty cache directory (full scan)
+    restart  new process over the checkpoints left by a cold render
+    warm     repeated renders in one process, appending turns in between
+
+and reports p50/p95/p99 latency, bytes read and lines parsed per render and
+the peak RSS of the process. Results are printed as a table and can be
+written as JSON to track regressions.
+
+Usage:
+    python bench_status_line.py --sizes 100K,1M,10M,100M,1G --json render.json
+
+Author: Russo Davide (The DaveEloper)
+Email: vibecoding@pcok.it
+Project: ChatTokener Suite
+Component: VAA Bonus - Status Line
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_transcript import SESSION_ID, append_turns, parse_size, write_transcript
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STATUS_LINE_DIR = Path(__file__).resolve().parent.parent
+MAIN_SCRIPT = STATUS_LINE_DIR / 'main_status_line.py'
+
+DEFAULT_SIZES = '100K,1M,10M,100M'
+APPENDED_ENTRIES = 4  # Entries appended before each warm render
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def make_payload(transcript, work_dir, session_id):
+    """Build the stdin payload Claude Code sends for a status line refresh."""
+    return {
+        "hook_event_name": "Status",
+        "session_id": session_id,
+        "transcript_path": transcript,
+        "cwd": work_dir,
+        "model": {"id": "claude-sonnet-4-20250514", "display_name": "Sonnet 4"},
+        "workspace": {"current_dir": work_dir, "project_dir": work_dir},
+        "version": "1.0.80",
+        "output_style": {"name": "default"},
+        "cost": {
+            "total_cost_usd": 1.2345,
+            "total_duration_ms": 3600000,
+            "total_api_duration_ms": 900000,
+            "total_lines_added": 120,
+            "total_lines_removed": 30,
+        },
+        "exceeds_200k_tokens": False,
+    }
+
+
+def run_worker():
+    """
+    Worker process: read a job from stdin, render it N times in-process and
+    print one JSON record per render plus the process peak RSS.
+    """
+    job = json.load(sys.stdin)
+    spec = importlib.util.spec_from_file_location('main_status_line', MAIN_SCRIPT)
+    status_line = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(status_line)
+    import_rss = peak_rss_mb()
+
+    renders = []
+    output = None
+    for i in range(job["renders"]):
+        if job["append"] and i:
+            append_turns(job["payload"]["transcript_path"], job["append"], job["payload"]["session_id"], seed=i)
+        status_line._PROFILE = {"segments": {}, "scans": []}
+        start = time.perf_counter()
+        output = status_line.generate_status_line(job["payload"], job["payload"]["cwd"])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        profile, status_line._PROFILE = status_line._PROFILE, None
+        renders.append({
+            "ms": round(elapsed_ms, 3),
+            "bytes_read": sum(scan["bytes_read"] for scan in profile["scans"]),
+            "lines_parsed": sum(scan["lines_parsed"] for scan in profile["scans"]),
+            "degraded": profile.get("degraded", []),
+        })
+    json.dump({"renders": renders, "import_rss_mb": import_rss, "peak_rss_mb": peak_rss_mb(),
+               "output": output}, sys.stdout)
+
+
+def run_job(payload, cache_dir, renders=1, append=0, render_cache=True, budget_ms=0):
+    """Run a worker process on a job and return its results and wall time."""
+    env = dict(os.environ,
+               STATUS_LINE_CACHE_DIR=cache_dir,
+               STATUS_LINE_SOCKET=os.path.join(cache_dir, 'no-daemon.sock'),
+               STATUS_LINE_RENDER_CACHE='1' if render_cache else '0',
+               STATUS_LINE_BUDGET_MS=str(budget_ms))
+    env.pop('STATUS_LINE_PROFILE', None)
+    job = json.dumps({"payload": payload, "renders": renders, "append": append})
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'], input=job,
+                            capture_output=True, text=True, env=env, check=False)
+    process_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark worker failed:\n{result.stderr}")
+    record = json.loads(result.stdout)
+    record["process_ms"] = round(process_ms, 2)
+    return record
+
+
+def summarize(records, skip_first=False):
+    """Aggregate worker records into latency percentiles, bytes read and peak RSS."""
+    renders = [render for record in records for render in record["renders"][1 if skip_first else 0:]]
+    timings = [render["ms"] for render in renders]
+    rss = [record["peak_rss_mb"] for record in records if record["peak_rss_mb"] is not None]
+    return {
+        "renders": len(renders),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+        "max_ms": round(max(timings), 2),
+        "bytes_read_per_render": round(statistics.mean(render["bytes_read"] for render in renders)),
+        "lines_parsed_per_render": round(statistics.mean(render["lines_parsed"] for render in renders)),
+        "degraded_renders": sum(1 for render in renders if render["degraded"]),
+        "peak_rss_mb": max(rss) if rss else None,
+        "process_ms_p50": round(statistics.median(record["process_ms"] for record in records), 2),
+    }
+
+
+def bench_size(size, args, work_dir):
+    """Generate a transcript of the given size and run every scenario on it."""
+    transcript = os.path.join(work_dir, 'transcript.jsonl')
+    lines = write_transcript(transcript, size, args.other_sessions, args.seed, args.sessions, args.oversized)
+    payload = make_payload(transcript, work_dir, SESSION_ID)
+    transcript_bytes = os.path.getsize(transcript)
+
+    cold, restart = [], []
+    for run in range(args.cold_runs):
+        cache_dir = os.path.join(work_dir, f'cache-{run}')
+        os.makedirs(cache_dir)
+        cold.append(run_job(payload, cache_dir, budget_ms=args.budget_ms))
+        # Same cache dir: checkpoints are reused, rendered segments are not
+        restart.append(run_job(payload, cache_dir, render_cache=False, budget_ms=args.budget_ms))
+
+    # One extra render warms the process up and is left out of the figures
+    warm = run_job(payload, os.path.join(work_dir, 'cache-0'), renders=args.renders + 1,
+                   append=APPENDED_ENTRIES, budget_ms=args.budget_ms)
+
+    for name in os.listdir(work_dir):
+        if name.startswith('cache-'):
+            shutil.rmtree(os.path.join(work_dir, name), ignore_errors=True)
+    os.remove(transcript)
+    return {
+        "transcript_bytes": transcript_bytes,
+        "transcript_lines": lines,
+        "import_rss_mb": cold[0]["import_rss_mb"],
+        "output": cold[0]["output"],
+        "scenarios": {
+            "cold": summarize(cold),
+            "restart": summarize(restart),
+            "warm": summarize([warm], skip_first=True),
+        },
+    }
+
+
+def format_bytes(count):
+    """Human-readable byte count."""
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+def main():
+    if '--worker' in sys.argv[1:]:
+        run_worker()
+        return
+
+    parser = argparse.ArgumentParser(description='Benchmark status line renders on synthetic transcripts')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'Comma-separated transcript sizes, up to 1G (default: {DEFAULT_SIZES})')
+    parser.add_argument('--other-sessions', type=float, default=0.3,
+                        help='Fraction of turns from other sessions (default: 0.3)')
+    parser.add_argument('--sessions', type=int, default=3, help='Number of other sessions (default: 3)')
+    parser.add_argument('--oversized', type=float, default=0.002,
+                        help='Fraction of user turns with a pasted 1 MB screenshot (default: 0.002)')
+    parser.add_argument('--cold-runs', type=int, default=3, help='Cold and restart processes per size (default: 3)')
+    parser.add_argument('-n', '--renders', type=int, default=20, help='Warm renders per size (default: 20)')
+    parser.add_argument('--budget-ms', type=float, default=0,
+                        help='STATUS_LINE_BUDGET_MS for the renders (default: 0, no deadline)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the transcripts (default: 0)')
+    parser.add_argument('--json', default=None, help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {
+        "python_version": sys.version.split()[0],
+        "platform": sys.platform,
+        "config": {key: value for key, value in vars(args).items() if key != 'json'},
+        "sizes": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix='status_line_bench_')
+    try:
+        for size in args.sizes.split(','):
+            print(f"Benchmarking {size.strip()}...", file=sys.stderr)
+            results["sizes"][size.strip()] = bench_size(parse_size(size), args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'size':>6} {'scenario':<8} {'p50':>9} {'p95':>9} {'p99':>9} {'read/render':>12} {'peak RSS':>9}   (ms, MB)")
+    for size, result in results["sizes"].items():
+        for name, scenario in result["scenarios"].items():
+            rss = scenario["peak_rss_mb"]
+            print(f"{size:>6} {name:<8} {scenario['p50_ms']:>9.2f} {scenario['p95_ms']:>9.2f} "
+                  f"{scenario['p99_ms']:>9.2f} {format_bytes(scenario['bytes_read_per_render']):>12} "
+                  f"{rss if rss is not None else '-':>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Synthetic Claude Code Transcript Generator
+
+Writes JSONL transcripts shaped like the ones Claude Code keeps under
+~/.claude/projects/: user prompts, assistant replies with token usage, tool
+calls and their results, system entries and, optionally, entries from other
+sessions resumed into the same file and oversized lines (pasted screenshots).
+Used by the benchmarks to get files of any size without relying on real
+conversations.
+
+Usage:
+    python synthetic_transcript.py out.jsonl --size 50M --other-sessions 0.3 --sessions 3 --oversized 0.01
+
+Author: Russo Davide (The DaveEloper)
+Email: vibecoding@pcok.it
+Project: ChatTokener Suite
+Component: VAA Bonus - Status Line
+"""
+
+import argparse
+import base64
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+SESSION_ID = "11111111-2222-3333-4444-555555555555"
+OTHER_SESSION_ID = "99999999-8888-7777-6666-555555555555"
+CWD = "/home/dev/projects/My Project"
+OVERSIZED_BYTES = 1024 * 1024  # Size of a pasted screenshot
+
+_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    """Parse a size such as 500K, 10M or 1G into bytes."""
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def other_session_ids(sessions):
+    """Ids of the other sessions resumed into the transcript."""
+    return [OTHER_SESSION_ID] + [f"{i:08x}-8888-7777-6666-555555555555" for i in range(1, sessions)]
+
+
+def _entries(rng, other_sessions, sessions=1, oversized=0.0, oversized_bytes=OVERSIZED_BYTES):
+    """Yield transcript entries forever, in conversation order."""
+    clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    others = other_session_ids(sessions)
+    parents = dict.fromkeys([SESSION_ID] + others)
+    turn = 0
+
+    def entry(session_id, entry_type, **fields):
+        nonlocal clock
+        clock += timedelta(seconds=rng.randint(1, 20), milliseconds=rng.randint(0, 999))
+        uuid = f"{rng.getrandbits(128):032x}"
+        record = {
+            "parentUuid": parents[session_id],
+            "isSidechain": False,
+            "userType": "external",
+            "cwd": CWD,
+            "sessionId": session_id,
+            "version": "1.0.0",
+            "type": entry_type,
+        }
+        record.update(fields)
+        record["uuid"] = uuid
+        record["timestamp"] = clock.strftime('%Y-%m-%dT%H:%M:%S.') + f"{clock.microsecond // 1000:03d}Z"
+        parents[session_id] = uuid
+        return record
+
+    while True:
+        turn += 1
+        session_id = SESSION_ID
+        if rng.random() < other_sessions:
+            session_id = others[0] if len(others) == 1 else rng.choice(others)
+        words = " ".join(rng.choice(("refactor", "the", "parser", "please", "test", "cache", "file"))
+                         for _ in range(rng.randint(5, 60)))
+        content = f"Turn {turn}: {words}"
+        if oversized and turn > 1 and rng.random() < oversized:
+            # Pasted screenshot: one line of about oversized_bytes
+            image = base64.b64encode(rng.getrandbits(oversized_bytes * 6).to_bytes(oversized_bytes * 3 // 4, 'little'))
+            content = [
+                {"type": "text", "text": content},
+                {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": image.decode('ascii')}},
+            ]
+        yield entry(session_id, "user", message={"role": "user", "content": content})
+        for _ in range(rng.randint(1, 6)):
+            usage = {
+                "input_tokens": rng.randint(1, 10),
+                "cache_creation_input_tokens": rng.randint(0, 5000),
+                "cache_read_input_tokens": rng.randint(10000, 150000),
+                "output_tokens": rng.randint(1, 2000),
+                "service_tier": "standard",
+            }
+            tool_id = f"toolu_{rng.getrandbits(64):016x}"
+            command = f"grep -rn pattern{rng.randint(0, 99)} src/"
+            yield entry(session_id, "assistant", requestId=f"req_{rng.getrandbits(64):016x}", message={
+                "id": f"msg_{rng.getrandbits(64):016x}",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-sonnet-4-20250514",
+                "content": [
+                    {"type": "text", "text": "Let me check. " + words[:rng.randint(0, len(words))]},
+                    {"type": "tool_use", "id": tool_id, "name": "Bash", "input": {"command": command}},
+                ],
+                "stop_reason": "tool_use",
+                "usage": usage,
+            })
+            output = "\n".join(f"src/file{i}.py:{rng.randint(1, 999)}: match" for i in range(rng.randint(0, 200)))
+            yield entry(session_id, "user", message={
+                "role": "user",
+                "content": [{"tool_use_id": tool_id, "type": "tool_result", "content": output}],
+            }, toolUseResult={"stdout": output, "stderr": "", "interrupted": False})
+        if rng.random() < 0.2:
+            yield entry(session_id, "system", content="Running PostToolUse hooks", level="info")
+
+
+def write_transcript(path, size, other_sessions=0.0, seed=0, sessions=1, oversized=0.0,
+                     oversized_bytes=OVERSIZED_BYTES):
+    """
+    Write a synthetic transcript of about size bytes (it stops at the first
+    line that crosses the size). other_sessions is the fraction of turns
+    spread over `sessions` other sessions, oversized the fraction of user
+    turns carrying a pasted image of oversized_bytes. Returns the number of
+    lines written.
+    """
+    rng = random.Random(seed)
+    written = 0
+    lines = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"type": "summary", "summary": "Synthetic session", "leafUuid": "0" * 32}) + "\n")
+        for record in _entries(rng, other_sessions, sessions, oversized, oversized_bytes):
+            if written >= size:
+                break
+            line = json.dumps(record, separators=(',', ':'), ensure_ascii=False) + "\n"
+            f.write(line)
+            written += len(line.encode('utf-8'))
+            lines += 1
+    return lines
+
+
+def append_turns(path, count, session_id=SESSION_ID, seed=0):
+    """Append count entries of session_id to a transcript, as a live session does."""
+    entries = _entries(random.Random(seed), 0.0)
+    with open(path, 'a', encoding='utf-8') as f:
+        for _ in range(count):
+            record = next(entries)
+            record["sessionId"] = session_id
+            f.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Claude Code transcript')
+    parser.add_argument('output', help='Path of the JSONL file to write')
+    parser.add_argument('--size', default='10M', help='Approximate size, e.g. 500K, 10M, 1G (default: 10M)')
+    parser.add_argument('--other-sessions', type=float, default=0.0,
+                        help='Fraction of turns belonging to other sessions (default: 0)')
+    parser.add_argument('--sessions', type=int, default=1,
+                        help='Number of other sessions sharing those turns (default: 1)')
+    parser.add_argument('--oversized', type=float, default=0.0,
+                        help='Fraction of user turns with a pasted 1 MB screenshot (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    lines = write_transcript(args.output, parse_size(args.size), args.other_sessions, args.seed,
+                             args.sessions, args.oversized)
+    print(f"Wrote {lines} lines to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,58 +17,236 @@ Component: VAA Bonus - Status Line
 
 import json
 import os
+import re
 import sys
-import subprocess
-from pathlib import Path
-from datetime import datetime
-
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv is optional
-
-
-# def log_status_line(input_data, status_line_output, error=None):
-#     """Log status line event to logs directory."""
-#     # Ensure logs directory exists
-#     log_dir = Path("logs")
-#     log_dir.mkdir(parents=True, exist_ok=True)
-#     log_file = log_dir / 'status_line.json'
-#     
-#     # Read existing log data or initialize empty list
-#     if log_file.exists():
-#         with open(log_file, 'r') as f:
-#             try:
-#                 log_data = json.load(f)
-#             except (json.JSONDecodeError, ValueError):
-#                 log_data = []
-#     else:
-#         log_data = []
-#     
-#     # Create log entry with input data and generated output
-#     log_entry = {
-#         "timestamp": datetime.now().isoformat(),
-#         "input_data": input_data,
-#         "status_line_output": status_line_output
-#     }
-#     
-#     if error:
-#         log_entry["error"] = str(error)
-#     
-#     # Append the log entry
-#     log_data.append(log_entry)
-#     
-#     # Write back to file with formatting
-#     with open(log_file, 'w') as f:
-#         json.dump(log_data, f, indent=2, default=str)
-
-
-def get_git_branch():
-    """Get current git branch name."""
+import time
+
+# Modules needed only by some renders (subprocess, datetime, dotenv, hashlib,
+# the daemon's socket modules) are imported where they are used, and paths are
+# handled with os.path because importing pathlib alone costs several ms.
+
+
+def _find_dotenv():
+    """Find the .env file load_dotenv() would use: next to this script or above it."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# Only pay for importing dotenv when there is something to load
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(_dotenv_path)
+    except ImportError:
+        pass  # dotenv is optional
+
+def _env_number(name, default, parse=float):
+    """
+    Read a numeric setting from the environment. An unset or malformed value
+    (say "1MB") falls back to default rather than breaking every render.
+    """
+    try:
+        value = parse(os.environ.get(name) or default)
+    except ValueError:
+        return default
+    # nan and infinity are no use as a size or a timeout
+    return value if value - value == 0 else default
+
+
+# Directory for on-disk state shared between status line invocations
+CACHE_DIR = os.environ.get('STATUS_LINE_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'claude_status_line')
+
+
+# Opt-in instrumentation: set STATUS_LINE_PROFILE=1 (or to a log file path)
+# to time each segment and record how much of the transcript every scan reads.
+PROFILE_LOG = os.environ.get('STATUS_LINE_PROFILE', '')
+if PROFILE_LOG in ('', '0'):
+    PROFILE_LOG = None
+elif PROFILE_LOG == '1':
+    PROFILE_LOG = os.path.join(CACHE_DIR, 'status_line_profile.jsonl')
+PROFILE_LOG_MAX_BYTES = _env_number('STATUS_LINE_PROFILE_MAX_BYTES', 1024 * 1024, int)
+
+# Measurements of the render in progress, or None when profiling is off
+_PROFILE = None
+
+# Profile of the render each fetch_sources thread works for (a
+# threading.local, created on first use). A thread abandoned at the deadline
+# keeps recording into its own render's profile, never into a later one.
+_THREAD_PROFILE = None
+
+
+def _current_profile():
+    """Get the profile measurements made on this thread belong to."""
+    if _THREAD_PROFILE is not None:
+        return getattr(_THREAD_PROFILE, 'profile', _PROFILE)
+    return _PROFILE
+
+
+class _SegmentTimer:
+    """Context manager that records the wall time of one segment."""
+    __slots__ = ('name', 'profile', 'start')
+
+    def __init__(self, name, profile):
+        self.name = name
+        self.profile = profile
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.profile["segments"][self.name] = round(elapsed_ms, 3)
+        return False
+
+
+class _NoTimer:
+    """Stand-in for _SegmentTimer when profiling is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timed(name):
+    """Time a block as segment name when profiling is on."""
+    profile = _current_profile()
+    return _SegmentTimer(name, profile) if profile is not None else _NO_TIMER
+
+
+def record_scan(kind, transcript_path, bytes_read, lines_parsed, start):
+    """Record the cost of one transcript scan when profiling is on."""
+    profile = _current_profile()
+    if profile is not None:
+        profile["scans"].append({
+            "kind": kind,
+            "path": transcript_path,
+            "bytes_read": bytes_read,
+            "lines_parsed": lines_parsed,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+
+
+def timed_call(name, func, *args):
+    """Call func(*args), timing it as segment name."""
+    with timed(name):
+        return func(*args)
+
+
+def log_status_line(log_entry, log_file=None):
+    """
+    Append a status line event as one JSON line to the log file.
+    The log is rotated to <log_file>.1 once it grows past PROFILE_LOG_MAX_BYTES,
+    so writing an entry never depends on the size of the existing log.
+    """
+    log_file = log_file or PROFILE_LOG
+    if not log_file:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        try:
+            if os.path.getsize(log_file) >= PROFILE_LOG_MAX_BYTES:
+                os.replace(log_file, f"{log_file}.1")
+        except OSError:
+            pass  # No log yet
+        with open(log_file, 'a') as f:
+            f.write(json.dumps(log_entry, default=str) + '\n')
+    except OSError:
+        pass
+
+
+# The in-process caches below are keyed by directory, transcript or session.
+# The daemon lives for days, so each keeps only its most recently used entries.
+MEMORY_CACHE_MAX_ENTRIES = 32
+
+
+def _lru_get(cache, key):
+    """Get a cache entry, marking it as the most recently used."""
+    value = cache.pop(key, None)
+    if value is not None:
+        cache[key] = value
+    return value
+
+
+def _lru_put(cache, key, value):
+    """Store a cache entry as the most recently used; return the keys evicted to make room."""
+    cache.pop(key, None)
+    cache[key] = value
+    evicted = []
+    while len(cache) > MEMORY_CACHE_MAX_ENTRIES:
+        try:
+            oldest = next(iter(cache))
+        except (StopIteration, RuntimeError):
+            break  # Emptied or changed by another thread
+        cache.pop(oldest, None)
+        evicted.append(oldest)
+    return evicted
+
+
+# Git HEAD files known to this process: start directory -> HEAD path, and
+# HEAD path -> (mtime_ns, branch) for the last time the file was read,
+# least recently used first.
+_GIT_HEAD_PATHS = {}
+_GIT_BRANCH_CACHE = {}
+
+
+def find_git_head(cwd=None):
+    """
+    Locate the HEAD file of the repository containing cwd.
+    Follows `gitdir:` files, as used by worktrees and submodules.
+    """
+    start = os.path.abspath(cwd or os.getcwd())
+    head_path = _lru_get(_GIT_HEAD_PATHS, start)
+    if head_path:
+        return head_path
+    
+    directory = start
+    while True:
+        dot_git = os.path.join(directory, '.git')
+        if os.path.isdir(dot_git):
+            head_path = os.path.join(dot_git, 'HEAD')
+            break
+        if os.path.isfile(dot_git):
+            try:
+                with open(dot_git, 'r') as f:
+                    content = f.read().strip()
+            except OSError:
+                return None
+            if not content.startswith('gitdir:'):
+                return None
+            git_dir = os.path.join(directory, content[len('gitdir:'):].strip())
+            head_path = os.path.join(os.path.normpath(git_dir), 'HEAD')
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None  # Not inside a repository
+        directory = parent
+    
+    _lru_put(_GIT_HEAD_PATHS, start, head_path)
+    return head_path
+
+
+def _get_git_branch_from_git(cwd=None):
+    """Get current git branch name by asking git itself."""
+    import subprocess
     try:
         result = subprocess.run(
             ['git', 'branch', '--show-current'],
+            cwd=cwd,
             capture_output=True,
             text=True,
             timeout=1,
@@ -81,6 +259,49 @@ def get_git_branch():
     return None
 
 
+def get_git_branch(cwd=None):
+    """
+    Get current git branch name by reading .git/HEAD directly.
+    Returns an empty string for a detached HEAD (like `git branch --show-current`)
+    and None outside a repository. The branch is cached on HEAD's mtime, so an
+    unchanged HEAD costs a single stat.
+    """
+    if os.environ.get('GIT_DIR'):
+        return _get_git_branch_from_git(cwd)
+    
+    head_path = find_git_head(cwd)
+    if not head_path:
+        return None
+    
+    try:
+        mtime_ns = os.stat(head_path).st_mtime_ns
+    except OSError:
+        _GIT_HEAD_PATHS.pop(os.path.abspath(cwd or os.getcwd()), None)
+        return _get_git_branch_from_git(cwd)
+    
+    cached = _lru_get(_GIT_BRANCH_CACHE, head_path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    
+    try:
+        with open(head_path, 'r') as f:
+            head = f.read().strip()
+    except OSError:
+        return _get_git_branch_from_git(cwd)
+    
+    if head.startswith('ref:'):
+        ref = head[len('ref:'):].strip()
+        if not ref.startswith('refs/heads/') or ref == 'refs/heads/.invalid':
+            # Unusual layout (e.g. reftable storage): let git resolve it
+            return _get_git_branch_from_git(cwd)
+        branch = ref[len('refs/heads/'):]
+    else:
+        branch = ''  # Detached HEAD
+    
+    _lru_put(_GIT_BRANCH_CACHE, head_path, (mtime_ns, branch))
+    return branch
+
+
 def format_cost(cost):
     """Format cost value with appropriate precision."""
     if cost == 0:
@@ -112,106 +333,1035 @@ def get_context_color(percentage):
         return "\033[31m"  # Red
 
 
-def get_session_data(session_id):
-    """Get session data including prompts from session file."""
-    session_file = Path(f".claude/data/sessions/{session_id}.json")
+# Session files known to this process: start directory -> sessions directory,
+# and session file -> (size, mtime_ns, data) for the last time it was read,
+# least recently used first.
+_SESSION_DIRS = {}
+_SESSION_FILE_CACHE = {}
+SESSION_CACHE_MAX_ENTRIES = 32
+SESSIONS_SUBDIR = os.path.join('.claude', 'data', 'sessions')
+
+
+def find_sessions_dir(cwd=None, project_dir=None):
+    """
+    Locate the .claude/data/sessions directory of the project.
+    Uses the workspace's project_dir when it has one, otherwise walks up
+    from cwd, so the status line finds it from any subdirectory.
+    """
+    if project_dir:
+        sessions_dir = os.path.join(os.path.abspath(project_dir), SESSIONS_SUBDIR)
+        if os.path.isdir(sessions_dir):
+            return sessions_dir
+    
+    start = os.path.abspath(cwd or os.getcwd())
+    sessions_dir = _lru_get(_SESSION_DIRS, start)
+    if sessions_dir:
+        return sessions_dir
+    
+    directory = start
+    while not os.path.isdir(os.path.join(directory, SESSIONS_SUBDIR)):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None  # No sessions directory above cwd
+        directory = parent
+    
+    sessions_dir = os.path.join(directory, SESSIONS_SUBDIR)
+    _lru_put(_SESSION_DIRS, start, sessions_dir)
+    return sessions_dir
+
+
+def get_session_data(session_id, cwd=None, project_dir=None):
+    """
+    Get session data including prompts from session file.
+    The parsed file is cached on its size and mtime, so an unchanged file
+    costs a single stat. Returns None if there is no readable session file;
+    while the file is being rewritten the last good copy is returned.
+    """
+    sessions_dir = find_sessions_dir(cwd, project_dir)
+    if not sessions_dir:
+        return None
+    session_file = os.path.join(sessions_dir, f"{session_id}.json")
     
-    if not session_file.exists():
+    try:
+        stat = os.stat(session_file)
+    except OSError:
+        _SESSION_FILE_CACHE.pop(session_file, None)
+        if not os.path.isdir(sessions_dir):
+            _SESSION_DIRS.pop(os.path.abspath(cwd or os.getcwd()), None)
         return None
     
+    cached = _SESSION_FILE_CACHE.pop(session_file, None)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        _SESSION_FILE_CACHE[session_file] = cached
+        return cached[2]
+    
     try:
-        with open(session_file, "r") as f:
+        with open(session_file, "r", encoding="utf-8") as f:
             session_data = json.load(f)
-            return session_data
+    except (OSError, ValueError):
+        # Half-written or unreadable: keep serving the previous content
+        if cached:
+            _SESSION_FILE_CACHE[session_file] = cached
+            return cached[2]
+        return None
+    
+    _SESSION_FILE_CACHE[session_file] = (stat.st_size, stat.st_mtime_ns, session_data)
+    while len(_SESSION_FILE_CACHE) > SESSION_CACHE_MAX_ENTRIES:
+        _SESSION_FILE_CACHE.pop(next(iter(_SESSION_FILE_CACHE)), None)
+    return session_data
+
+
+# Transcript checkpoints known to this process, keyed on (path, session_id),
+# least recently used first. Each one records how far the transcript has been
+# scanned and the scan state up to that offset, plus the result for the
+# file's last seen size and mtime.
+_SCAN_CACHE = {}
+_SCAN_LOCKS = {}  # One lock per key, so concurrent renders never scan the same range twice
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_TAIL_BYTES = 64  # Bytes before the offset used to detect replaced files
+CHECKPOINT_INTERVAL_BYTES = 8 * 1024 * 1024  # Save progress this often during long scans
+HEAD_READ_LIMIT = 1024 * 1024  # Bytes searched for the first user message
+CHECKPOINT_MAX_AGE_DAYS = 30  # Checkpoints and session indexes not written for this long are deleted
+_PRUNED_PREFIXES = ('scan-', 'index-')
+
+# Decoder for transcript lines: auto, orjson, msgspec or json
+JSON_BACKEND = os.environ.get('STATUS_LINE_JSON_BACKEND', 'auto')
+_FAST_LOADS = None
+
+
+def set_json_backend(name='auto'):
+    """
+    Select the decoder used for transcript lines and return the name of the
+    one in use. orjson and msgspec are optional; 'auto' tries them in that
+    order and any backend that is not installed falls back to json.
+    """
+    global _FAST_LOADS
+    candidates = ('orjson', 'msgspec') if name == 'auto' else (name,)
+    for candidate in candidates:
+        try:
+            if candidate == 'orjson':
+                import orjson
+                _FAST_LOADS = orjson.loads
+                return candidate
+            if candidate == 'msgspec':
+                import msgspec
+                _FAST_LOADS = msgspec.json.Decoder().decode
+                return candidate
+        except ImportError:
+            continue
+    _FAST_LOADS = json.loads
+    return 'json'
+
+
+def _json_loads(raw):
+    """Decode one transcript line with the selected backend."""
+    if _FAST_LOADS is None:
+        set_json_backend(JSON_BACKEND)
+    loads = _FAST_LOADS
+    if loads is json.loads:
+        return loads(raw)
+    try:
+        return loads(raw)
+    except Exception:
+        # Backends are stricter than json (big integers, NaN...): let json decide
+        return json.loads(raw)
+
+
+def _session_marker(session_id):
+    """
+    Get the bytes a line must contain to belong to session_id, or None if
+    the id could be escaped in JSON and raw lines cannot be matched on it.
+    """
+    if not session_id or not session_id.isascii() or not session_id.isprintable():
+        return None
+    if '"' in session_id or '\\' in session_id:
+        return None
+    return session_id.encode('ascii')
+
+
+def _may_be_first_user_message(data, start, end, session_marker):
+    """Tell from the raw bytes of data[start:end] whether the line could hold the first user message."""
+    if data.find(b'"user"', start, end) == -1:
+        return False
+    # Lines of other sessions only qualify as the root of the transcript
+    return (session_marker is None or data.find(session_marker, start, end) != -1 or
+            data.find(b'"parentUuid":"', start, end) == -1)
+
+
+def _skip_line(data, start, end, session_marker, state):
+    """
+    Tell from the raw bytes of data[start:end] that the line belongs to another
+    session and cannot change the scan state, so that it need not be decoded.
+    """
+    if session_marker is None or data.find(session_marker, start, end) != -1:
+        return False
+    if data.find(b'"sessionId":"', start, end) == -1 or data.find(b'"sessionId":""', start, end) != -1:
+        return False  # Entries without a session id count for every session
+    # Another session's entry can at most still provide the first user message
+    return bool(state["first_user_message"]) or not _may_be_first_user_message(data, start, end, session_marker)
+
+
+def _new_scan_state():
+    """Return an empty transcript scan result."""
+    return {
+        "user_count": 0,
+        "assistant_count": 0,
+        "first_user_message": None,
+        "last_usage": None,
+        "first_timestamp": None,
+        "last_timestamp": None,
+        "last_response_time": None,
+        "error": False,
+    }
+
+
+def _extract_first_user_message(entry, session_id):
+    """Return the display text of a user entry if it qualifies as first message."""
+    if entry.get('type') != 'user' or entry.get('isMeta'):
+        return None
+    # Must match session ID or be the very first message (parentUuid is null)
+    if not ((session_id and entry.get('sessionId') == session_id) or entry.get('parentUuid') is None):
+        return None
+    message = entry.get('message', {})
+    if message.get('role') != 'user':
+        return None
+    content = message.get('content')
+    if isinstance(content, str):
+        return content
+    elif isinstance(content, list) and len(content) > 0:
+        # Extract text from content array
+        for item in content:
+            if isinstance(item, dict) and item.get('type') == 'text':
+                text = item.get('text', '')
+                # Clean up the message
+                if text and not text.startswith('<command'):
+                    # Remove leading pipe and arrow if present
+                    return text.lstrip('│ > ').lstrip('> ')
+    return None
+
+
+def _has_token_usage(usage):
+    """Check whether a usage block reports any processed tokens."""
+    return bool(usage) and (usage.get('input_tokens', 0) > 0 or
+                            usage.get('cache_creation_input_tokens', 0) > 0 or
+                            usage.get('output_tokens', 0) > 0)
+
+
+def _scan_entry(entry, session_id, state):
+    """Fold a single transcript entry into the scan state."""
+    # Each block mirrors one of the former per-function scans, so a malformed
+    # field only affects the figures that depend on it.
+    try:
+        # Message counts and timestamps skip entries from other sessions
+        if not (session_id and entry.get('sessionId') and entry.get('sessionId') != session_id):
+            entry_type = entry.get('type')
+            if entry_type == 'user' and not entry.get('isMeta'):
+                state["user_count"] += 1
+            elif entry_type == 'assistant':
+                # Only count assistant messages with actual content
+                message = entry.get('message', {})
+                if message.get('usage') or message.get('content'):
+                    state["assistant_count"] += 1
+    except Exception:
+        pass
+
+    try:
+        if not (session_id and entry.get('sessionId') and entry.get('sessionId') != session_id):
+            timestamp = entry.get('timestamp')
+            if timestamp:
+                if not state["first_timestamp"]:
+                    state["first_timestamp"] = timestamp
+                state["last_timestamp"] = timestamp
+
+            # Track assistant response time (could be in metadata)
+            if entry.get('type') == 'assistant':
+                metadata = entry.get('metadata', {})
+                if 'response_time' in metadata:
+                    state["last_response_time"] = metadata['response_time']
+    except Exception:
+        pass
+
+    try:
+        # Capture first user message (skip meta messages and wrong sessions)
+        if not state["first_user_message"]:
+            first_message = _extract_first_user_message(entry, session_id)
+            if first_message:
+                state["first_user_message"] = first_message
+
+        # Only look at assistant messages from main session
+        if entry.get('type') == 'assistant' and not (session_id and entry.get('sessionId') != session_id):
+            usage = entry.get('message', {}).get('usage', {})
+            # Only consider messages with actual token usage
+            if _has_token_usage(usage):
+                state["last_usage"] = usage
+    except Exception:
+        pass
+
+
+# Lines longer than this (pasted screenshots, huge tool outputs) are not
+# decoded whole: _skim_entry streams them and keeps only the fields below
+SKIM_LINE_THRESHOLD = 256 * 1024
+SKIM_CHUNK_SIZE = 64 * 1024
+SKIM_STRING_LIMIT = 64 * 1024  # Longer kept strings (e.g. a pasted first message) are truncated
+
+# Fields of an entry the status line reads: None keeps the whole value, a
+# dict keeps only the listed keys ('*' for the items of a list)
+SKIM_FIELDS = {
+    'type': None,
+    'sessionId': None,
+    'isMeta': None,
+    'timestamp': None,
+    'parentUuid': None,
+    'metadata': {'response_time': None},
+    'message': {
+        'role': None,
+        'usage': None,
+        'content': {'*': {'type': None, 'text': None}},
+    },
+}
+
+_SKIP = object()  # Sentinel spec for values that are parsed but not kept
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SCALAR = re.compile(rb'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null')
+_SCALAR_END = re.compile(rb'[,\]} \t\r\n]')
+_PARTIAL_ESCAPE = re.compile(rb'(?<!\\)(?:\\\\)*\\(?:u[0-9a-fA-F]{0,3})?\Z')
+
+
+class _LineStream:
+    """
+    A single oversized transcript line, data[start:end], consumed in chunks
+    through a small sliding buffer.
+    """
+
+    def __init__(self, data, start, end, chunk_size=None):
+        self.data = data
+        self.next = start  # Offset in data of the next chunk
+        self.end = end
+        self.chunk_size = chunk_size or SKIM_CHUNK_SIZE
+        self.buf = b''
+        self.pos = 0
+
+    @property
+    def done(self):
+        return self.next >= self.end
+
+    def fill(self):
+        """Append the next chunk of the line to the buffer; False at its end."""
+        if self.next >= self.end:
+            return False
+        stop = min(self.next + self.chunk_size, self.end)
+        self.buf = self.buf[self.pos:] + self.data[self.next:stop]
+        self.next = stop
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next byte, or None at the end of the line."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            if not self.fill():
+                return None
+
+    def expect(self, token):
+        """Consume a structural character."""
+        if self.peek() != token:
+            raise ValueError(f"expected {token!r}")
+        self.pos += 1
+
+    def read_scalar(self):
+        """Read a number, true, false or null."""
+        while not _SCALAR_END.search(self.buf, self.pos) and self.fill():
+            pass  # Make sure the whole token is buffered
+        match = _SCALAR.match(self.buf, self.pos)
+        if not match or not (match.end() == len(self.buf) or _SCALAR_END.match(self.buf, match.end())):
+            raise ValueError("invalid literal")
+        self.pos = match.end()
+        return json.loads(match.group())
+
+    def read_string(self, keep):
+        """Consume a string; returns it (truncated to SKIM_STRING_LIMIT) if keep."""
+        self.pos += 1  # Opening quote
+        parts = []
+        kept = 0
+        truncated = False
+        while True:
+            end = _STRING_BODY.match(self.buf, self.pos).end()
+            if keep and not truncated:
+                piece = self.buf[self.pos:end]
+                if kept + len(piece) > SKIM_STRING_LIMIT:
+                    piece = piece[:SKIM_STRING_LIMIT - kept]
+                    truncated = True
+                parts.append(piece)
+                kept += len(piece)
+            self.pos = end
+            if end < len(self.buf) and self.buf[end:end + 1] == b'"':
+                self.pos += 1
+                break
+            # End of the buffer, possibly in the middle of an escape
+            if not self.fill():
+                raise ValueError("unterminated string")
+        if not keep:
+            return None
+        raw = b''.join(parts)
+        if truncated:
+            # Cut where the limit split an escape or a UTF-8 sequence
+            raw = _PARTIAL_ESCAPE.sub(b'', raw)
+            text = json.loads(b'"' + raw.decode('utf-8', 'ignore').encode('utf-8') + b'"')
+            if text and '\ud800' <= text[-1] <= '\udbff':
+                text = text[:-1]  # Half of a surrogate pair
+            return text
+        return json.loads(b'"' + raw + b'"')
+
+
+def _skim_value(stream, spec):
+    """Parse one JSON value from the stream and return the part spec keeps."""
+    token = stream.peek()
+    keep = spec is not _SKIP
+    if token == b'"':
+        return stream.read_string(keep)
+    if token == b'{':
+        stream.pos += 1
+        result = {} if keep else None
+        if stream.peek() == b'}':
+            stream.pos += 1
+            return result
+        while True:
+            if stream.peek() != b'"':
+                raise ValueError("expected key")
+            key = stream.read_string(True)
+            stream.expect(b':')
+            if spec is None:
+                child_spec = None
+            elif keep:
+                child_spec = spec.get(key, _SKIP)
+            else:
+                child_spec = _SKIP
+            value = _skim_value(stream, child_spec)
+            if child_spec is not _SKIP:
+                result[key] = value
+            token = stream.peek()
+            stream.pos += 1
+            if token == b'}':
+                return result
+            if token != b',':
+                raise ValueError("expected , or }")
+    if token == b'[':
+        stream.pos += 1
+        result = [] if keep else None
+        item_spec = spec.get('*', _SKIP) if keep and spec is not None else spec
+        if stream.peek() == b']':
+            stream.pos += 1
+            return result
+        while True:
+            value = _skim_value(stream, item_spec)
+            if keep:
+                # Items that are not kept stay as None, so the length is preserved
+                result.append(value)
+            token = stream.peek()
+            stream.pos += 1
+            if token == b']':
+                return result
+            if token != b',':
+                raise ValueError("expected , or ]")
+    if token is None:
+        raise ValueError("unexpected end of line")
+    value = stream.read_scalar()
+    return value if keep else None
+
+
+def _skim_entry(stream):
+    """
+    Parse an oversized transcript line in bounded memory, keeping only the
+    SKIM_FIELDS of the entry. Returns None if the line is not valid JSON.
+    String contents that are not kept are skipped without being validated.
+    """
+    try:
+        entry = _skim_value(stream, SKIM_FIELDS)
+        if stream.peek() is not None:
+            raise ValueError("extra data")
+    except (ValueError, RecursionError):
+        return None
+    return entry
+
+
+def _load_entry(data, start, end):
+    """
+    Decode the transcript line data[start:end], or None if it is not valid
+    JSON. Lines longer than SKIM_LINE_THRESHOLD are skimmed instead, so only
+    their SKIM_FIELDS are returned.
+    """
+    if end - start > SKIM_LINE_THRESHOLD:
+        return _skim_entry(_LineStream(data, start, end))
+    try:
+        return _json_loads(data[start:end].strip())
     except Exception:
         return None
 
 
+class _MappedTranscript:
+    """
+    Context manager mapping the first size bytes of a transcript read-only.
+    Lines are then found with find/rfind on the mapping and only those that
+    pass the raw-bytes filters are copied out and decoded; the mapping shares
+    the page cache with concurrent status line processes. Files that cannot
+    be mapped (empty, or on unusual filesystems) are read instead.
+    """
+
+    def __init__(self, transcript_path, size):
+        self.transcript_path = transcript_path
+        self.size = size
+        self.f = None
+        self.data = b''
+
+    def __enter__(self):
+        self.f = open(self.transcript_path, 'rb')
+        if self.size > 0:
+            import mmap
+            try:
+                self.data = mmap.mmap(self.f.fileno(), self.size, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # E.g. truncated since it was stat'ed: read what is there
+                self.data = self.f.read(self.size)
+        return self.data
+
+    def __exit__(self, *exc_info):
+        if not isinstance(self.data, bytes):
+            self.data.close()
+        self.f.close()
+        return False
+
+
+def _checkpoint_path(transcript_path, session_id):
+    """Get the checkpoint file for a transcript and session."""
+    import hashlib
+    key = f"{os.path.abspath(transcript_path)}\0{session_id or ''}"
+    digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()[:20]
+    return os.path.join(CACHE_DIR, f"scan-{digest}.json")
+
+
+def _load_checkpoint(checkpoint_file, version=CHECKPOINT_VERSION):
+    """Load a scan checkpoint (or session index) from disk, or None if missing or unusable."""
+    try:
+        with open(checkpoint_file, 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(checkpoint, dict) or checkpoint.get('version') != version:
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_file, checkpoint):
+    """
+    Atomically write a scan checkpoint; failures only cost a rescan later.
+    Creating a new checkpoint file also prunes the old ones.
+    """
+    try:
+        os.makedirs(os.path.dirname(checkpoint_file), exist_ok=True)
+        new_file = not os.path.exists(checkpoint_file)
+        tmp_file = f"{checkpoint_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_file, checkpoint_file)
+    except OSError:
+        return
+    if new_file:
+        prune_checkpoints()
+
+
+def prune_checkpoints(max_age_days=CHECKPOINT_MAX_AGE_DAYS):
+    """
+    Delete the checkpoint and session index files in CACHE_DIR not written
+    for max_age_days. A transcript still in use rewrites them as it grows;
+    one shown again after being pruned is simply scanned from the start.
+    Also drops the whole-line render cache older versions kept.
+    """
+    cutoff = time.time() - max_age_days * 86400
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if not name.startswith(_PRUNED_PREFIXES) and name != 'render_cache.json':
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            if name == 'render_cache.json' or os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # Already removed by another process
+
+
+def _read_tail(data, offset):
+    """Get the bytes just before offset, used to fingerprint a checkpoint."""
+    return data[max(0, offset - CHECKPOINT_TAIL_BYTES):offset]
+
+
+def _checkpoint_matches(checkpoint, stat, data):
+    """Check that the transcript is still the file the checkpoint was taken from."""
+    if not checkpoint:
+        return False
+    try:
+        offset = checkpoint['offset']
+        if checkpoint['inode'] != stat.st_ino or checkpoint['device'] != stat.st_dev:
+            return False  # Replaced (e.g. rewritten to a new file)
+        if offset > len(data):
+            return False  # Truncated
+        return _read_tail(data, offset).hex() == checkpoint['tail']
+    except (KeyError, TypeError, OSError):
+        return False
+
+
+# Per-transcript index of which byte ranges hold which session's entries,
+# so resumed conversations with several sessions in one file only read the
+# current session's lines
+INDEX_VERSION = 1
+_SESSION_INDEXES = {}  # Transcript path -> latest session index, least recently used first
+_SESSION_ID_FIELD = re.compile(rb'"sessionId":"([^"\\]*)"')
+_TIMESTAMP_FIELD = re.compile(rb'"timestamp":"([^"\\]*)"')
+
+
+def _index_path(transcript_path):
+    """Get the session index file for a transcript."""
+    import hashlib
+    key = os.path.abspath(transcript_path)
+    digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()[:20]
+    return os.path.join(CACHE_DIR, f"index-{digest}.json")
+
+
+def _new_session_index(stat):
+    """
+    Return an empty session index. Besides the checkpoint fields it holds,
+    as [start, end) byte ranges of whole lines:
+    - sessions: per session id its ranges and first/last timestamp
+    - shared: lines without exactly one session id, which can matter to any session
+    - roots: user lines without a parent, candidates for the first user message
+    """
+    return {
+        "version": INDEX_VERSION,
+        "inode": stat.st_ino,
+        "device": stat.st_dev,
+        "offset": 0,
+        "tail": "",
+        "sessions": {},
+        "shared": [],
+        "roots": [],
+    }
+
+
+def _add_range(ranges, start, end):
+    """Append a range, merging it with the last one when they touch."""
+    if ranges and ranges[-1][1] == start:
+        # Replaced rather than updated: older copies of the index share it
+        ranges[-1] = [ranges[-1][0], end]
+    else:
+        ranges.append([start, end])
+
+
+def _index_line(index, data, start, end):
+    """Record the line data[start:end] (newline included) in the session index."""
+    match = _SESSION_ID_FIELD.search(data, start, end)
+    if match and match.group(1) and not _SESSION_ID_FIELD.search(data, match.end(), end):
+        session_id = match.group(1).decode('utf-8', 'replace')
+        info = index["sessions"].get(session_id)
+        if info is None:
+            info = index["sessions"][session_id] = {"ranges": [], "first_timestamp": None, "last_timestamp": None}
+        _add_range(info["ranges"], start, end)
+        timestamp = _TIMESTAMP_FIELD.search(data, start, end)
+        if timestamp:
+            info["last_timestamp"] = timestamp.group(1).decode('utf-8', 'replace')
+            if not info["first_timestamp"]:
+                info["first_timestamp"] = info["last_timestamp"]
+    else:
+        _add_range(index["shared"], start, end)
+    if data.find(b'"user"', start, end) != -1 and data.find(b'"parentUuid":"', start, end) == -1:
+        _add_range(index["roots"], start, end)
+
+
+def _current_session_index(transcript_path, stat, data):
+    """Get the latest session index of a transcript if it still describes the file."""
+    index = _lru_get(_SESSION_INDEXES, transcript_path) or _load_checkpoint(_index_path(transcript_path), INDEX_VERSION)
+    if not _checkpoint_matches(index, stat, data):
+        return None
+    return index
+
+
+def _load_session_index(transcript_path, stat, data):
+    """
+    Get a copy of the session index of a transcript that can be extended
+    with new lines, or an empty one if there is no usable index.
+    """
+    index = _current_session_index(transcript_path, stat, data)
+    try:
+        return dict(index, shared=list(index["shared"]), roots=list(index["roots"]), sessions={
+            session_id: dict(info, ranges=list(info["ranges"]))
+            for session_id, info in index["sessions"].items()
+        })
+    except (KeyError, TypeError, AttributeError):
+        return _new_session_index(stat)
+
+
+def _save_session_index(transcript_path, index, data, publish=True):
+    """
+    Persist a session index that now covers data up to its offset and, if
+    publish, make it the latest one (it must not be extended afterwards).
+    """
+    index["tail"] = _read_tail(data, index["offset"]).hex()
+    current = _SESSION_INDEXES.get(transcript_path)
+    if publish and (not current or current["offset"] <= index["offset"] or current["inode"] != index["inode"]):
+        _lru_put(_SESSION_INDEXES, transcript_path, index)
+    _save_checkpoint(_index_path(transcript_path), index)
+
+
+def _session_ranges(index, session_id, start, end, include_roots=True):
+    """
+    Get the sorted, merged byte ranges within [start, end) holding the lines
+    that can matter to session_id: its own, the shared ones and, if asked,
+    the root user lines.
+    """
+    info = index["sessions"].get(session_id)
+    ranges = list(index["shared"])
+    if info:
+        ranges.extend(info["ranges"])
+    if include_roots:
+        ranges.extend(index["roots"])
+    merged = []
+    for range_start, range_end in sorted(ranges):
+        range_start, range_end = max(range_start, start), min(range_end, end)
+        if range_start >= range_end:
+            continue
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def _iter_lines(data, start, end):
+    """Yield (start, stop) for the lines of data[start:end]; stop excludes the newline."""
+    while start < end:
+        newline = data.find(b'\n', start, end)
+        if newline == -1:
+            yield start, end
+            return
+        yield start, newline
+        start = newline + 1
+
+
+def _scan_line(data, start, end, session_id, state, session_marker=None):
+    """
+    Decode the transcript line data[start:end] and fold it into the scan
+    state. Returns whether the line had to be decoded.
+    """
+    if _skip_line(data, start, end, session_marker, state):
+        return False
+    entry = _load_entry(data, start, end)
+    if entry is not None:
+        _scan_entry(entry, session_id, state)
+    return True
+
+
+def _make_checkpoint(stat, offset, tail, state):
+    """Build the checkpoint record for a scan that reached offset."""
+    return {
+        "version": CHECKPOINT_VERSION,
+        "inode": stat.st_ino,
+        "device": stat.st_dev,
+        "offset": offset,
+        "tail": tail,
+        "state": state,
+    }
+
+
+def _scan_lock(key):
+    """Get the lock serialising scans of one transcript and session."""
+    import threading
+    lock = _SCAN_LOCKS.get(key)
+    if lock is None:
+        lock = _SCAN_LOCKS.setdefault(key, threading.Lock())
+        if len(_SCAN_LOCKS) > 2 * MEMORY_CACHE_MAX_ENTRIES:
+            # Drop the locks of transcripts no longer cached, unless a scan holds them
+            for other, other_lock in list(_SCAN_LOCKS.items()):
+                if other != key and other not in _SCAN_CACHE and not other_lock.locked():
+                    _SCAN_LOCKS.pop(other, None)
+    return lock
+
+
+def _scan_is_current(cached, stat):
+    """Check whether a cached scan covers the transcript as it is now."""
+    return bool(cached) and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns
+
+
+def scan_transcript(transcript_path, session_id):
+    """
+    Walk the transcript once and collect everything the status line needs.
+    Returns a dict with message counts, last usage, first user message and
+    first/last timestamps, or None if the transcript does not exist.
+
+    Lines of other sessions are recognised on their raw bytes and skipped
+    without being decoded, unless they could still be the first user message.
+
+    Transcripts are append-only, so the scan state is checkpointed on disk
+    together with the byte offset it covers, and later calls only parse the
+    lines appended since. A truncated or replaced file triggers a full scan.
+    Long scans save their progress periodically, so a render that gives up
+    on its deadline still leaves less work for the next one.
+    """
+    if not transcript_path:
+        return None
+    key = (transcript_path, session_id)
+    with _scan_lock(key):
+        return _scan_transcript_locked(transcript_path, session_id, key)
+
+
+def _scan_transcript_locked(transcript_path, session_id, key):
+    """Body of scan_transcript, run while holding the key's scan lock."""
+    try:
+        stat = os.stat(transcript_path)
+    except OSError:
+        return None
+
+    cached = _lru_get(_SCAN_CACHE, key)
+    if _scan_is_current(cached, stat):
+        return cached['result']
+
+    scan_start = time.perf_counter()
+    checkpoint_file = _checkpoint_path(transcript_path, session_id)
+    checkpoint = cached or _load_checkpoint(checkpoint_file)
+
+    try:
+        with _MappedTranscript(transcript_path, stat.st_size) as data:
+            resumed = _checkpoint_matches(checkpoint, stat, data)
+            if resumed:
+                offset = checkpoint['offset']
+                state = dict(checkpoint['state'])
+            else:
+                offset = 0
+                state = _new_scan_state()
+            start_offset = offset
+            saved_offset = offset
+            result = state
+            lines_parsed = 0
+            bytes_scanned = 0
+            session_marker = _session_marker(session_id)
+            size = len(data)
+
+            def save_progress(offset):
+                progress = _make_checkpoint(stat, offset, _read_tail(data, offset).hex(), dict(state))
+                _save_checkpoint(checkpoint_file, progress)
+                return offset
+
+            # Sessions whose id can be matched on raw bytes use the session index
+            index = _load_session_index(transcript_path, stat, data) if session_marker is not None else None
+            if index is not None and index["offset"] > offset:
+                # Lines already indexed: only read the ranges that matter to this session
+                for range_start, range_end in _session_ranges(index, session_id, offset, index["offset"],
+                                                              include_roots=not state["first_user_message"]):
+                    for line_start, line_stop in _iter_lines(data, range_start, range_end):
+                        lines_parsed += _scan_line(data, line_start, line_stop, session_id, state, session_marker)
+                    bytes_scanned += range_end - range_start
+                    if range_end - saved_offset >= CHECKPOINT_INTERVAL_BYTES:
+                        saved_offset = save_progress(range_end)
+                offset = index["offset"]
+
+            # New lines: index them, and scan those after the checkpoint
+            line_start = offset if index is None else index["offset"]
+            while line_start < size:
+                newline = data.find(b'\n', line_start, size)
+                if newline == -1:
+                    # Entry still being written: show it now, but resume before it next time
+                    result = dict(state)
+                    lines_parsed += _scan_line(data, line_start, size, session_id, result, session_marker)
+                    bytes_scanned += size - line_start
+                    break
+                if index is not None:
+                    _index_line(index, data, line_start, newline + 1)
+                if line_start >= offset:
+                    lines_parsed += _scan_line(data, line_start, newline, session_id, state, session_marker)
+                    bytes_scanned += newline + 1 - line_start
+                    offset = newline + 1
+                line_start = newline + 1
+                if offset - saved_offset >= CHECKPOINT_INTERVAL_BYTES:
+                    saved_offset = save_progress(offset)
+                    if index is not None:
+                        index["offset"] = line_start
+                        _save_session_index(transcript_path, index, data, publish=False)
+
+            if index is not None and index["offset"] != line_start:
+                index["offset"] = line_start
+                _save_session_index(transcript_path, index, data)
+            tail = _read_tail(data, offset).hex()
+    except Exception:
+        result = _new_scan_state()
+        result["error"] = True
+        return result
+
+    checkpoint = _make_checkpoint(stat, offset, tail, state)
+    if offset != saved_offset or not resumed:
+        _save_checkpoint(checkpoint_file, checkpoint)
+    record_scan("forward" if resumed else "full", transcript_path, bytes_scanned, lines_parsed, scan_start)
+
+    _lru_put(_SCAN_CACHE, key, dict(checkpoint, size=stat.st_size, mtime_ns=stat.st_mtime_ns, result=result))
+    return result
+
+
+def _iter_lines_reversed(data, end, stats=None, begin=0):
+    """
+    Yield (start, stop) for the non-empty lines of data[begin:end], newest
+    first; stop excludes the newline. If stats is given, stats["bytes_read"]
+    is kept up to date.
+    """
+    stop = end
+    while stop > begin:
+        newline = data.rfind(b'\n', begin, stop)
+        start = newline + 1 if newline != -1 else begin
+        if stats is not None:
+            stats["bytes_read"] += stop - max(newline, begin)
+        if start < stop:
+            yield start, stop
+        if newline == -1:
+            break
+        stop = newline
+
+
+def find_last_usage(transcript_path, session_id):
+    """
+    Find the usage block of the newest assistant entry with token usage by
+    reading the transcript backwards, so the cost does not grow with its length.
+    """
+    start = time.perf_counter()
+    stats = {"bytes_read": 0}
+    lines_parsed = 0
+    usage = None
+    session_marker = _session_marker(session_id)
+    stat = os.stat(transcript_path)
+    with _MappedTranscript(transcript_path, stat.st_size) as data:
+        segments = [(0, len(data))]
+        index = _current_session_index(transcript_path, stat, data) if session_marker is not None else None
+        if index is not None:
+            # Lines not indexed yet, then this session's ranges, newest first
+            segments = [(index["offset"], len(data))] + [
+                tuple(r) for r in reversed(_session_ranges(index, session_id, 0, index["offset"], include_roots=False))]
+        lines = (line for begin, end in segments for line in _iter_lines_reversed(data, end, stats, begin))
+        for line_start, line_stop in lines:
+            if (data.find(b'"usage"', line_start, line_stop) == -1 or
+                    data.find(b'"assistant"', line_start, line_stop) == -1):
+                continue
+            if session_marker is not None and data.find(session_marker, line_start, line_stop) == -1:
+                continue  # Another session
+            lines_parsed += 1
+            entry = _load_entry(data, line_start, line_stop)
+            try:
+                if entry.get('type') != 'assistant':
+                    continue
+                # Skip if different session ID
+                if session_id and entry.get('sessionId') != session_id:
+                    continue
+                entry_usage = entry.get('message', {}).get('usage', {})
+                if _has_token_usage(entry_usage):
+                    usage = entry_usage
+                    break
+            except Exception:
+                continue
+    record_scan("tail", transcript_path, stats["bytes_read"], lines_parsed, start)
+    return usage
+
+
+def _known_first_user_message(transcript_path, session_id, stat):
+    """
+    Get the first user message from an earlier scan of this transcript, if any.
+    The transcript only grows, so once found the first message never changes.
+    """
+    checkpoint = _SCAN_CACHE.get((transcript_path, session_id))
+    if not checkpoint:
+        checkpoint = _load_checkpoint(_checkpoint_path(transcript_path, session_id))
+    try:
+        if (checkpoint['inode'] == stat.st_ino and checkpoint['device'] == stat.st_dev and
+                checkpoint['offset'] <= stat.st_size):
+            return checkpoint['state'].get('first_user_message')
+    except (KeyError, TypeError, AttributeError):
+        pass
+    return None
+
+
+def find_first_user_message(transcript_path, session_id, limit=HEAD_READ_LIMIT):
+    """
+    Find the first user message within the first limit bytes of the
+    transcript, or of the lines that matter to the session if it is indexed.
+    """
+    start = time.perf_counter()
+    read = 0
+    lines_parsed = 0
+    first_message = None
+    session_marker = _session_marker(session_id)
+    stat = os.stat(transcript_path)
+    with _MappedTranscript(transcript_path, stat.st_size) as data:
+        segments = [(0, len(data))]
+        index = _current_session_index(transcript_path, stat, data) if session_marker is not None else None
+        if index is not None:
+            segments = [tuple(r) for r in _session_ranges(index, session_id, 0, index["offset"])]
+            segments.append((index["offset"], len(data)))
+        for line_start, line_stop in (line for begin, end in segments for line in _iter_lines(data, begin, end)):
+            if read >= limit:
+                break
+            if read + line_stop - line_start > limit and line_stop - line_start <= SKIM_LINE_THRESHOLD:
+                read = limit  # Cut by the limit
+                break
+            read += line_stop - line_start + 1
+            if not _may_be_first_user_message(data, line_start, line_stop, session_marker):
+                continue
+            lines_parsed += 1
+            try:
+                first_message = _extract_first_user_message(_load_entry(data, line_start, line_stop), session_id)
+            except Exception:
+                continue
+            if first_message:
+                break
+    record_scan("head", transcript_path, min(read, stat.st_size), lines_parsed, start)
+    return first_message or None
+
+
 def count_messages_in_transcript(transcript_path, session_id):
     """Count total user and assistant messages in the transcript."""
-    if not transcript_path or not Path(transcript_path).exists():
+    if not transcript_path or not os.path.exists(transcript_path):
         return 0, 0
     
-    user_count = 0
-    assistant_count = 0
-    
-    try:
-        with open(transcript_path, 'r') as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    
-                    # Skip if different session ID  
-                    if session_id and entry.get('sessionId') and entry.get('sessionId') != session_id:
-                        continue
-                    
-                    entry_type = entry.get('type')
-                    if entry_type == 'user' and not entry.get('isMeta'):
-                        user_count += 1
-                    elif entry_type == 'assistant':
-                        # Only count assistant messages with actual content
-                        message = entry.get('message', {})
-                        if message.get('usage') or message.get('content'):
-                            assistant_count += 1
-                            
-                except (json.JSONDecodeError, Exception):
-                    continue
-    except Exception:
-        pass
+    scan = scan_transcript(transcript_path, session_id)
+    if not scan:
+        return 0, 0
     
-    return user_count, assistant_count
+    return scan["user_count"], scan["assistant_count"]
 
 
 def get_execution_time_from_transcript(transcript_path, session_id):
     """Get execution time of last assistant response and total session time."""
-    if not transcript_path or not Path(transcript_path).exists():
+    if not transcript_path or not os.path.exists(transcript_path):
         return None, None
     
-    first_timestamp = None
-    last_timestamp = None
-    last_response_time = None
+    scan = scan_transcript(transcript_path, session_id)
+    if not scan:
+        return None, None
     
-    try:
-        with open(transcript_path, 'r') as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    
-                    # Skip if different session ID
-                    if session_id and entry.get('sessionId') and entry.get('sessionId') != session_id:
-                        continue
-                    
-                    # Get timestamps
-                    timestamp = entry.get('timestamp')
-                    if timestamp:
-                        if not first_timestamp:
-                            first_timestamp = timestamp
-                        last_timestamp = timestamp
-                    
-                    # Track assistant response time (could be in metadata)
-                    if entry.get('type') == 'assistant':
-                        metadata = entry.get('metadata', {})
-                        if 'response_time' in metadata:
-                            last_response_time = metadata['response_time']
-                            
-                except (json.JSONDecodeError, Exception):
-                    continue
-                    
-        # Calculate session duration
-        session_duration = None
-        if first_timestamp and last_timestamp:
-            try:
-                from datetime import datetime
-                first = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
-                last = datetime.fromisoformat(last_timestamp.replace('Z', '+00:00'))
-                duration_seconds = (last - first).total_seconds()
-                if duration_seconds > 0:
-                    session_duration = duration_seconds
-            except:
-                pass
-                
-    except Exception:
-        pass
+    first_timestamp = scan["first_timestamp"]
+    last_timestamp = scan["last_timestamp"]
+    last_response_time = scan["last_response_time"]
+    
+    # Calculate session duration
+    session_duration = None
+    if first_timestamp and last_timestamp and not scan["error"]:
+        try:
+            from datetime import datetime
+            first = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
+            last = datetime.fromisoformat(last_timestamp.replace('Z', '+00:00'))
+            duration_seconds = (last - first).total_seconds()
+            if duration_seconds > 0:
+                session_duration = duration_seconds
+        except:
+            pass
     
     return last_response_time, session_duration
 
@@ -237,60 +1387,28 @@ def get_real_token_usage(input_data):
     Returns dict with total_tokens and first_message, or None if parsing fails.
     """
     transcript_path = input_data.get('transcript_path')
-    if not transcript_path or not Path(transcript_path).exists():
+    if not transcript_path or not os.path.exists(transcript_path):
         return None
     
     session_id = input_data.get('session_id')
-    last_usage = None
-    first_user_message = None
     
+    # Reuse a scan of the current transcript if this process already has one,
+    # otherwise look the usage up from the end of the file
     try:
-        with open(transcript_path, 'r') as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    
-                    # Capture first user message (skip meta messages and wrong sessions)
-                    if not first_user_message and entry.get('type') == 'user' and not entry.get('isMeta'):
-                        # Must match session ID or be the very first message (parentUuid is null)
-                        if (session_id and entry.get('sessionId') == session_id) or entry.get('parentUuid') is None:
-                            message = entry.get('message', {})
-                            if message.get('role') == 'user':
-                                content = message.get('content')
-                                if isinstance(content, str):
-                                    first_user_message = content
-                                elif isinstance(content, list) and len(content) > 0:
-                                    # Extract text from content array
-                                    for item in content:
-                                        if isinstance(item, dict) and item.get('type') == 'text':
-                                            text = item.get('text', '')
-                                            # Clean up the message
-                                            if text and not text.startswith('<command'):
-                                                # Remove leading pipe and arrow if present
-                                                text = text.lstrip('│ > ').lstrip('> ')
-                                                first_user_message = text
-                                                break
-                    
-                    # Only look at assistant messages from main session
-                    if entry.get('type') == 'assistant':
-                        # Skip if different session ID
-                        if session_id and entry.get('sessionId') != session_id:
-                            continue
-                            
-                        message = entry.get('message', {})
-                        usage = message.get('usage', {})
-                        
-                        # Only consider messages with actual token usage
-                        if usage and (usage.get('input_tokens', 0) > 0 or 
-                                     usage.get('cache_creation_input_tokens', 0) > 0 or
-                                     usage.get('output_tokens', 0) > 0):
-                            last_usage = usage
-                            
-                except json.JSONDecodeError:
-                    continue
-                except Exception:
-                    continue
-    
+        stat = os.stat(transcript_path)
+        scan = _SCAN_CACHE.get((transcript_path, session_id))
+        if _scan_is_current(scan, stat):
+            scan = scan['result']
+            if scan["error"]:
+                return None
+            last_usage = scan["last_usage"]
+            first_user_message = scan["first_user_message"]
+        else:
+            last_usage = find_last_usage(transcript_path, session_id)
+            first_user_message = None
+            if last_usage:
+                first_user_message = (_known_first_user_message(transcript_path, session_id, stat) or
+                                      find_first_user_message(transcript_path, session_id))
     except Exception:
         return None
     
@@ -322,60 +1440,409 @@ def get_real_token_usage(input_data):
     }
 
 
-def generate_status_line(input_data):
-    """Generate status line with costs and context window usage."""
-    parts = []
+# Rendered segments of recent renders, keyed on a hash of the segment name
+# and its key inputs, as [created_at, expires_at, text]. Loaded lazily from
+# disk so one-shot invocations share it.
+_SEGMENT_CACHE = None
+
+RENDER_CACHE_ENABLED = os.environ.get('STATUS_LINE_RENDER_CACHE', '1') != '0'
+SEGMENT_CACHE_MAX_ENTRIES = 256
+DEFAULT_SEGMENT_TTL = 300  # Seconds
+
+
+def _file_signature(path):
+    """Return [size, mtime_ns] of a file, or None if it cannot be stat'ed."""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _transcript_key(input_data, cwd=None):
+    """Key input for transcript-derived segments: path, size and mtime."""
+    transcript_path = input_data.get('transcript_path')
+    if not transcript_path:
+        return None
+    return [transcript_path, _file_signature(transcript_path)]
+
+
+def _git_head_key(input_data, cwd=None):
+    """Key input for the git branch: HEAD's path, size and mtime."""
+    if os.environ.get('GIT_DIR'):
+        return None  # HEAD is wherever git says it is
+    head_path = find_git_head(cwd)
+    if not head_path:
+        return None
+    return [head_path, _file_signature(head_path)]
+
+
+# Cheap values that segment cache keys are built from, by name. Each is a
+# function of (input_data, cwd), computed at most once per render; None
+# means the segment cannot be cached for this input.
+KEY_INPUTS = {
+    "model": lambda input_data, cwd: input_data.get('model'),
+    "cost": lambda input_data, cwd: input_data.get('cost'),
+    "session_id": lambda input_data, cwd: input_data.get('session_id'),
+    "exceeds_200k_tokens": lambda input_data, cwd: input_data.get('exceeds_200k_tokens', False),
+    "transcript": _transcript_key,
+    "git_head": _git_head_key,
+}
+
+
+def _segment_cache_key(name, segment, input_data, cwd, key_inputs):
+    """
+    Build the cache key of a segment from its key inputs, memoising named
+    inputs in key_inputs. Returns None when the segment is not cached.
+    """
+    if not RENDER_CACHE_ENABLED or not segment["key"] or segment["ttl"] == 0:
+        return None
+    import hashlib
+    inputs = []
+    for key_input in segment["key"]:
+        if callable(key_input):
+            value = key_input(input_data, cwd)
+        else:
+            if key_input not in key_inputs:
+                key_inputs[key_input] = KEY_INPUTS[key_input](input_data, cwd)
+            value = key_inputs[key_input]
+        if value is None:
+            return None
+        inputs.append(value)
+    encoded = json.dumps([name, inputs], sort_keys=True, default=str).encode('utf-8', 'surrogateescape')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def _segment_cache_file():
+    return os.path.join(CACHE_DIR, 'segment_cache.json')
+
+
+def _load_segment_cache():
+    """Get the segment cache, reading it from disk on first use."""
+    global _SEGMENT_CACHE
+    if _SEGMENT_CACHE is None:
+        _SEGMENT_CACHE = {}
+        try:
+            with open(_segment_cache_file(), 'r') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                _SEGMENT_CACHE = entries
+        except (OSError, ValueError):
+            pass  # No segment cache yet
+    return _SEGMENT_CACHE
+
+
+def lookup_segment_cache(key):
+    """Return (text,) for a key if its entry is still fresh, else None."""
+    if not key:
+        return None
+    entry = _load_segment_cache().get(key)
+    try:
+        created_at, expires_at, text = entry
+        if expires_at is None or time.time() < expires_at:
+            return (text,)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def store_segment_cache(entries):
+    """
+    Store rendered segments, given as {key: (text, ttl)}, evicting expired
+    and least recent entries.
+    """
+    cache = _load_segment_cache()
+    now = time.time()
+    for key, (text, ttl) in entries.items():
+        cache[key] = [now, None if ttl is None else now + ttl, text]
     
-    # Model name
-    model_info = input_data.get('model', {})
-    model_name = model_info.get('display_name', 'Claude')
-    parts.append(f"\033[36m[{model_name}]\033[0m")  # Cyan
+    fresh = []
+    for entry_key, entry in cache.items():
+        try:
+            if entry[1] is None or now < entry[1]:
+                fresh.append((entry[0], entry_key, entry))
+        except (TypeError, IndexError):
+            continue
+    fresh.sort(reverse=True)
+    cache.clear()
+    cache.update((entry_key, entry) for _, entry_key, entry in fresh[:SEGMENT_CACHE_MAX_ENTRIES])
     
-    # Get session data for prompts
-    session_id = input_data.get('session_id', '')
-    session_data = get_session_data(session_id) if session_id else None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{_segment_cache_file()}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, _segment_cache_file())
+    except OSError:
+        pass
+
+
+def format_clock():
+    """Format the current time segment, which is never cached."""
+    # Current time (optional, useful for tracking session duration)
+    current_time = time.strftime("%H:%M")
+    return f"\033[90m⏰ {current_time}\033[0m"  # Gray
+
+
+# Total time a render may take before expensive segments are given up on;
+# STATUS_LINE_BUDGET_MS=0 waits for every segment.
+RENDER_BUDGET_MS = _env_number('STATUS_LINE_BUDGET_MS', 500)
+
+# Last value each expensive source produced, per source key, used in place
+# of a source that misses the render deadline. Loaded lazily from disk.
+_LAST_VALUES = None
+LAST_VALUES_MAX_ENTRIES = 64
+
+# Segments of the last render that failed, or whose sources missed the
+# deadline (or failed)
+_LAST_DEGRADED = []
+
+
+def _last_values_file():
+    return os.path.join(CACHE_DIR, 'last_values.json')
+
+
+def _load_last_values():
+    """Get the last-value store, reading it from disk on first use."""
+    global _LAST_VALUES
+    if _LAST_VALUES is None:
+        _LAST_VALUES = {}
+        try:
+            with open(_last_values_file(), 'r') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                _LAST_VALUES = entries
+        except (OSError, ValueError):
+            pass
+    return _LAST_VALUES
+
+
+def _save_last_values(store):
+    """Write the last-value store, keeping only the most recent entries."""
+    if len(store) > LAST_VALUES_MAX_ENTRIES:
+        newest = sorted(store.items(), key=lambda item: item[1][0], reverse=True)
+        store.clear()
+        store.update(newest[:LAST_VALUES_MAX_ENTRIES])
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{_last_values_file()}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(store, f)
+        os.replace(tmp_file, _last_values_file())
+    except OSError:
+        pass
+
+
+def fetch_sources(sources, timeout=None):
+    """
+    Compute independent data sources, given as {name: (cache_key, function)}.
+
+    All sources run concurrently on daemon threads (the first one on the
+    calling thread), so the wall time is that of the slowest source rather
+    than their sum. With a timeout (seconds), sources still running at the
+    deadline are abandoned, so a hung git or a huge transcript cannot hold up
+    the render or the process exit. A source that misses the deadline or
+    raises is reported as degraded and replaced by its last known value, if
+    it has a cache_key and one was stored. Returns (values, degraded).
+    """
+    global _THREAD_PROFILE
+    import threading
+    if _THREAD_PROFILE is None:
+        _THREAD_PROFILE = threading.local()
+    outcomes = {}
+    profile = _current_profile()
     
-    # Message counter
-    transcript_path = input_data.get('transcript_path')
-    user_count, assistant_count = count_messages_in_transcript(transcript_path, session_id)
-    if user_count > 0 or assistant_count > 0:
-        parts.append(f"\033[95m💬 {user_count}/{assistant_count}\033[0m")  # Magenta
+    def run(name, func):
+        _THREAD_PROFILE.profile = profile
+        try:
+            outcomes[name] = (True, func())
+        except Exception:
+            outcomes[name] = (False, None)
+        finally:
+            del _THREAD_PROFILE.profile
     
-    # Todo list status (if todos are present in input_data)
-    todos = input_data.get('todos', [])
-    if todos:
-        completed = sum(1 for t in todos if t.get('status') == 'completed')
-        total = len(todos)
-        # Color based on completion
-        if completed == total:
-            todo_color = "\033[32m"  # Green - all done
-        elif completed > total / 2:
-            todo_color = "\033[33m"  # Yellow - more than half done
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    items = list(sources.items())
+    threads = []
+    for name, (_, func) in items[1:]:
+        thread = threading.Thread(target=run, args=(name, func), daemon=True)
+        thread.start()
+        threads.append(thread)
+    if items:
+        name, (_, func) = items[0]
+        if deadline is None:
+            run(name, func)
         else:
-            todo_color = "\033[91m"  # Light Red - less than half done
-        parts.append(f"{todo_color}📝 {completed}/{total}\033[0m")
+            # Even the first source must respect the deadline
+            thread = threading.Thread(target=run, args=(name, func), daemon=True)
+            thread.start()
+            threads.append(thread)
+    for thread in threads:
+        thread.join(None if deadline is None else max(0.0, deadline - time.perf_counter()))
     
-    # Git branch (if available)
-    git_branch = get_git_branch()
+    store = _load_last_values()
+    changed = False
+    values = {}
+    degraded = []
+    for name, (cache_key, _) in sources.items():
+        store_key = f"{name}:{cache_key}"
+        outcome = outcomes.get(name)
+        if outcome and outcome[0]:
+            values[name] = outcome[1]
+            if cache_key is None:
+                continue
+            previous = store.get(store_key)
+            if not previous or previous[1] != outcome[1]:
+                store[store_key] = [time.time(), outcome[1]]
+                changed = True
+        else:
+            degraded.append(name)
+            if cache_key is not None and store_key in store:
+                values[name] = store[store_key][1]
+    if changed:
+        _save_last_values(store)
+    return values, degraded
+
+
+def get_transcript_summary(transcript_path, session_id):
+    """Get [user_count, assistant_count, session_duration] from the transcript."""
+    with timed("messages"):
+        user_count, assistant_count = count_messages_in_transcript(transcript_path, session_id)
+    with timed("execution_time"):
+        last_response_time, session_duration = get_execution_time_from_transcript(transcript_path, session_id)
+    return [user_count, assistant_count, session_duration]
+
+
+def _transcript_source(input_data, cwd):
+    session_id = input_data.get('session_id', '')
+    transcript_path = input_data.get('transcript_path')
+    return f"{transcript_path}\0{session_id}", lambda: get_transcript_summary(transcript_path, session_id)
+
+
+def _usage_source(input_data, cwd):
+    transcript_key = f"{input_data.get('transcript_path')}\0{input_data.get('session_id', '')}"
+    return transcript_key, lambda: timed_call("token_usage", get_real_token_usage, input_data)
+
+
+def _git_source(input_data, cwd):
+    return os.path.abspath(cwd or os.getcwd()), lambda: timed_call("git", get_git_branch, cwd)
+
+
+def _session_source(input_data, cwd):
+    session_id = input_data.get('session_id', '')
+    if not session_id:
+        return None
+    workspace = input_data.get('workspace')
+    project_dir = workspace.get('project_dir') if isinstance(workspace, dict) else None
+    return None, lambda: timed_call("session_data", get_session_data, session_id, cwd, project_dir)
+
+
+# Data sources segments draw on, by name. Each builder takes (input_data, cwd)
+# and returns the (cache_key, function) pair fetch_sources expects, or None
+# when the source does not apply to this input. No built-in segment uses
+# "session" (the project's session file): it is there for custom segments,
+# and only read when an enabled one asks for it.
+SOURCES = {
+    "transcript": _transcript_source,
+    "usage": _usage_source,
+    "git": _git_source,
+    "session": _session_source,
+}
+
+
+def gather_status_data(input_data, cwd=None, timeout=None, names=None):
+    """
+    Fetch the independent data sources of a render in parallel (by default
+    those the registered segments use: the transcript summary, token usage
+    and the git branch). Returns (values, degraded) as fetch_sources does.
+    """
+    if names is None:
+        names = []
+        for segment in SEGMENTS.values():
+            names.extend(source for source in segment["sources"] if source not in names)
+    sources = {}
+    for name in names:
+        source = SOURCES[name](input_data, cwd)
+        if source is not None:
+            sources[name] = source
+    return fetch_sources(sources, timeout)
+
+
+def _segment_model(input_data, values):
+    model_info = input_data.get('model', {})
+    model_name = model_info.get('display_name', 'Claude')
+    return f"\033[36m[{model_name}]\033[0m"  # Cyan
+
+
+def _segment_messages(input_data, values):
+    user_count, assistant_count, session_duration = values.get("transcript") or (0, 0, None)
+    if user_count > 0 or assistant_count > 0:
+        return f"\033[95m💬 {user_count}/{assistant_count}\033[0m"  # Magenta
+    return None
+
+
+def _segment_todos(input_data, values):
+    todos = input_data.get('todos', [])
+    if not todos:
+        return None
+    completed = sum(1 for t in todos if t.get('status') == 'completed')
+    total = len(todos)
+    # Color based on completion
+    if completed == total:
+        todo_color = "\033[32m"  # Green - all done
+    elif completed > total / 2:
+        todo_color = "\033[33m"  # Yellow - more than half done
+    else:
+        todo_color = "\033[91m"  # Light Red - less than half done
+    return f"{todo_color}📝 {completed}/{total}\033[0m"
+
+
+def _segment_git(input_data, values):
+    git_branch = values.get("git")
     if git_branch:
-        parts.append(f"\033[32m🌿 {git_branch}\033[0m")  # Green
-    
+        return f"\033[32m🌿 {git_branch}\033[0m"  # Green
+    return None
+
+
+def _segment_cost(input_data, values):
     # Session costs - Extract from the cost field
-    cost_data = input_data.get('cost', {})
-    session_cost = cost_data.get('total_cost_usd', 0)
-    
-    # Format and add cost
+    session_cost = input_data.get('cost', {}).get('total_cost_usd', 0)
     if session_cost > 0:
         cost_str = format_cost(session_cost)
-        parts.append(f"\033[33m💰 {cost_str}\033[0m")  # Yellow
-    else:
-        parts.append(f"\033[90m💰 $0.00\033[0m")  # Gray
+        return f"\033[33m💰 {cost_str}\033[0m"  # Yellow
+    return f"\033[90m💰 $0.00\033[0m"  # Gray
+
+
+def _segment_first_message(input_data, values):
+    token_data = values.get("usage")
+    if not token_data or not token_data.get('total_tokens'):
+        return None
+    first_msg = token_data.get('first_message')
+    if not first_msg:
+        return None
+    # Truncate at first backslash or § if present
+    backslash_pos = first_msg.find('\\')
+    section_pos = first_msg.find('§')
     
-    # Context window usage - try to get real tokens first
+    # Find the earliest delimiter position
+    delimiter_positions = [pos for pos in [backslash_pos, section_pos] if pos != -1]
+    if delimiter_positions:
+        first_delimiter = min(delimiter_positions)
+        first_msg = first_msg[:first_delimiter]
+    
+    # Clean the message for display
+    first_msg = first_msg.replace('\n', ' ').replace('\r', '')
+    return f"\033[95m💬 {first_msg}\033[0m"  # Magenta for message
+
+
+def _segment_context(input_data, values):
+    session_cost = input_data.get('cost', {}).get('total_cost_usd', 0)
     exceeds_200k = input_data.get('exceeds_200k_tokens', False)
     
     # Set context window based on model
-    model_id = model_info.get('id', '')
+    model_id = input_data.get('model', {}).get('id', '')
     if 'opus' in model_id.lower():
         context_window = 200000
         avg_rate = 30  # For fallback estimation
@@ -390,28 +1857,11 @@ def generate_status_line(input_data):
         avg_rate = 6
     
     # Try to get real token usage from transcript
-    token_data = get_real_token_usage(input_data)
+    token_data = values.get("usage")
     
     if token_data and token_data.get('total_tokens'):
         # Use TOTAL tokens processed (including cache) - this is what fills Claude's head!
         tokens_used = token_data['total_tokens']  # The full 149k, not just the 778 new ones
-        
-        # Add first message preview if available
-        first_msg = token_data.get('first_message')
-        if first_msg:
-            # Truncate at first backslash or § if present
-            backslash_pos = first_msg.find('\\')
-            section_pos = first_msg.find('§')
-            
-            # Find the earliest delimiter position
-            delimiter_positions = [pos for pos in [backslash_pos, section_pos] if pos != -1]
-            if delimiter_positions:
-                first_delimiter = min(delimiter_positions)
-                first_msg = first_msg[:first_delimiter]
-            
-            # Clean the message for display
-            first_msg = first_msg.replace('\n', ' ').replace('\r', '')
-            parts.append(f"\033[95m💬 {first_msg}\033[0m")  # Magenta for message
     else:
         # Fallback to estimation from cost
         if session_cost > 0 and avg_rate > 0:
@@ -446,53 +1896,294 @@ def generate_status_line(input_data):
     
     # Add context window usage with color-coded bar
     context_str = f"{color}[{progress_bar}] {usage_percentage}% ({tokens_display}/{context_display})\033[0m"
-    parts.append(f"📊 {context_str}")
-    
-    # Session info (optional)
+    return f"📊 {context_str}"
+
+
+def _segment_session_id(input_data, values):
     session_id = input_data.get('session_id', '')
-    if session_id:
-        # Show shortened session ID
-        short_id = session_id[:8] if len(session_id) > 8 else session_id
-        parts.append(f"\033[90m#{short_id}\033[0m")  # Gray
-    
-    # Execution time
-    last_response_time, session_duration = get_execution_time_from_transcript(transcript_path, session_id)
+    if not session_id:
+        return None
+    # Show shortened session ID
+    short_id = session_id[:8] if len(session_id) > 8 else session_id
+    return f"\033[90m#{short_id}\033[0m"  # Gray
+
+
+def _segment_duration(input_data, values):
+    user_count, assistant_count, session_duration = values.get("transcript") or (0, 0, None)
     if session_duration:
         duration_str = format_duration(session_duration)
-        parts.append(f"\033[94m⏱️ {duration_str}\033[0m")  # Light Blue
+        return f"\033[94m⏱️ {duration_str}\033[0m"  # Light Blue
+    return None
+
+
+# Status line segments in display order: name -> {"render", "sources", "key", "ttl"}.
+# See register_segment; STATUS_LINE_SEGMENTS picks and orders the ones shown.
+SEGMENTS = {}
+
+ENABLED_SEGMENTS = os.environ.get('STATUS_LINE_SEGMENTS', '')
+
+
+def register_segment(name, render, sources=(), key=None, ttl=DEFAULT_SEGMENT_TTL, before=None):
+    """
+    Register a status line segment, last or before the segment named before.
     
-    # Current time (optional, useful for tracking session duration)
-    current_time = datetime.now().strftime("%H:%M")
-    parts.append(f"\033[90m⏰ {current_time}\033[0m")  # Gray
+    render(input_data, values) returns the segment text, or None to leave it
+    out; values holds the SOURCES named in sources, which are only fetched
+    when an enabled segment needs them. A segment with key inputs (names
+    from KEY_INPUTS, or functions of (input_data, cwd)) reuses its cached
+    text while they are unchanged, for up to ttl seconds (None: no limit,
+    0: never cached). Segments without a key render every time and must be
+    cheap.
+    """
+    SEGMENTS.pop(name, None)
+    segment = {"render": render, "sources": tuple(sources), "key": tuple(key or ()), "ttl": ttl}
+    items = list(SEGMENTS.items())
+    names = [existing for existing, _ in items]
+    position = names.index(before) if before in names else len(items)
+    items.insert(position, (name, segment))
+    SEGMENTS.clear()
+    SEGMENTS.update(items)
+
+
+def enabled_segments():
+    """Names of the segments to render, in order."""
+    if not ENABLED_SEGMENTS:
+        return list(SEGMENTS)
+    names = [name.strip() for name in ENABLED_SEGMENTS.split(',')]
+    return [name for name in names if name in SEGMENTS]
+
+
+_TRANSCRIPT_KEY = ("transcript", "session_id")
+
+register_segment("model", _segment_model)
+register_segment("messages", _segment_messages, sources=("transcript",), key=_TRANSCRIPT_KEY)
+register_segment("todos", _segment_todos)
+register_segment("git", _segment_git, sources=("git",), key=("git_head",))
+register_segment("cost", _segment_cost)
+register_segment("first_message", _segment_first_message, sources=("usage",), key=_TRANSCRIPT_KEY)
+register_segment("context", _segment_context, sources=("usage",),
+                 key=_TRANSCRIPT_KEY + ("model", "cost", "exceeds_200k_tokens"))
+register_segment("session_id", _segment_session_id)
+register_segment("duration", _segment_duration, sources=("transcript",), key=_TRANSCRIPT_KEY)
+register_segment("clock", lambda input_data, values: format_clock())
+
+
+STALE_MARKER = "\033[90m~\033[0m"  # Gray, after a segment showing its last known value
+
+
+def generate_status_line(input_data, cwd=None):
+    """
+    Generate status line with costs and context window usage.
+    cwd is the directory the status line was invoked from (defaults to ours).
+    
+    The line is made of the enabled SEGMENTS, in order. A cached segment
+    whose key inputs are unchanged is reused as is, so only the sources of
+    the other segments are fetched. Those share the RENDER_BUDGET_MS budget;
+    any that miss it fall back to their last value, marked with STALE_MARKER,
+    or are left out. The segments affected, and those whose render raised,
+    are listed in _LAST_DEGRADED.
+    """
+    global _LAST_DEGRADED
+    start = time.perf_counter()
+    segments = [(name, SEGMENTS[name]) for name in enabled_segments()]
+    texts = {}
+    cache_keys = {}
+    with timed("segment_cache"):
+        key_inputs = {}
+        for name, segment in segments:
+            cache_key = _segment_cache_key(name, segment, input_data, cwd, key_inputs)
+            cached = lookup_segment_cache(cache_key)
+            if cached is not None:
+                texts[name] = cached[0]
+            else:
+                cache_keys[name] = cache_key
+    
+    # Gather the sources of the segments left, concurrently, then format
+    needed = []
+    for name, segment in segments:
+        if name not in texts:
+            needed.extend(source for source in segment["sources"] if source not in needed)
+    values, failed_sources = {}, []
+    if needed:
+        timeout = None
+        if RENDER_BUDGET_MS > 0:
+            timeout = max(0.0, RENDER_BUDGET_MS / 1000 - (time.perf_counter() - start))
+        values, failed_sources = gather_status_data(input_data, cwd, timeout, needed)
+    
+    fresh = {}
+    degraded = []
+    for name, segment in segments:
+        if name in texts:
+            continue
+        try:
+            texts[name] = segment["render"](input_data, values)
+        except Exception:
+            texts[name] = None
+            degraded.append(name)
+            continue
+        if any(source in failed_sources for source in segment["sources"]):
+            # A degraded segment must not outlive the slow render that produced it
+            degraded.append(name)
+            if texts[name]:
+                texts[name] = f"{texts[name]}{STALE_MARKER}"
+        elif cache_keys[name]:
+            fresh[cache_keys[name]] = (texts[name], segment["ttl"])
+    if fresh:
+        store_segment_cache(fresh)
+    
+    _LAST_DEGRADED = degraded
+    if _PROFILE is not None:
+        _PROFILE["degraded"] = degraded
     
-    return " | ".join(parts)
+    return " | ".join(texts[name] for name, _ in segments if texts[name])
 
 
-def main():
+def render_status_line(raw_input, cwd=None):
+    """Render the status line for a raw stdin payload, never raising."""
+    global _PROFILE
+    if PROFILE_LOG:
+        _PROFILE = {"segments": {}, "scans": []}
+    start = time.perf_counter()
+    input_data = {}
+    error_msg = None
     try:
         # Read JSON input from stdin
-        input_data = json.loads(sys.stdin.read())
+        input_data = json.loads(raw_input)
         
         # Generate status line
-        status_line = generate_status_line(input_data)
-        
-        # Log the status line event
-        # log_status_line(input_data, status_line)
-        
-        # Output the status line
-        print(status_line)
+        status_line = generate_status_line(input_data, cwd)
         
     except json.JSONDecodeError as e:
         error_msg = f"Failed to parse JSON input: {e}"
-        fallback_status = "\033[31m[Error]\033[0m Failed to parse status data"
-        # log_status_line({}, fallback_status, error_msg)
-        print(fallback_status)
+        status_line = "\033[31m[Error]\033[0m Failed to parse status data"
     except Exception as e:
         error_msg = f"Status line error: {e}"
-        fallback_status = "\033[31m[Error]\033[0m Status line generation failed"
-        # log_status_line({}, fallback_status, error_msg)
-        print(fallback_status)
+        status_line = "\033[31m[Error]\033[0m Status line generation failed"
+    
+    # Log the status line event with its timings
+    if _PROFILE is not None:
+        log_entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "session_id": input_data.get('session_id') if isinstance(input_data, dict) else None,
+            "total_ms": round((time.perf_counter() - start) * 1000, 3),
+            "segments": _PROFILE["segments"],
+            "scans": _PROFILE["scans"],
+            "degraded": _PROFILE.get("degraded", []),
+            "status_line_output": status_line,
+        }
+        if error_msg:
+            log_entry["error"] = error_msg
+        _PROFILE = None
+        log_status_line(log_entry)
+    
+    return status_line
+
+
+def get_daemon_socket_path():
+    """Get the Unix socket path the status line daemon listens on."""
+    return os.environ.get('STATUS_LINE_SOCKET') or os.path.join(CACHE_DIR, 'daemon.sock')
+
+
+def run_daemon(socket_path=None, idle_timeout=None):
+    """
+    Serve status line renders over a Unix domain socket.
+
+    The daemon keeps transcript scans and other per-session state in memory
+    between renders, for the MEMORY_CACHE_MAX_ENTRIES most recently used
+    transcripts and projects. Each request is a JSON object {"cwd": ..., "input": ...}
+    where input is the raw stdin payload; the reply is the rendered line.
+    Requests are handled one at a time, but source threads abandoned at a
+    render's deadline (see fetch_sources) can still be running during the
+    next requests. They record their timings into their own render's profile.
+    The caches they share with later renders are safe to use concurrently:
+    transcript scans hold a lock per transcript and session, session
+    indexes are replaced rather than modified, and the other caches only
+    store or drop whole entries. The segment cache and the last-value store
+    are only written by the request thread.
+    """
+    import signal
+    import socket
+    import socketserver
+    from pathlib import Path
+
+    socket_path = Path(socket_path or get_daemon_socket_path())
+    socket_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    if socket_path.exists():
+        # Refuse to start twice, but clean up after a daemon that died
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+            print(f"Status line daemon already running on {socket_path}", file=sys.stderr)
+            return 1
+        except OSError:
+            socket_path.unlink()
+        finally:
+            probe.close()
+
+    class StatusLineHandler(socketserver.StreamRequestHandler):
+        timeout = 5
+
+        def handle(self):
+            try:
+                payload = self.rfile.read()
+                if not payload:
+                    return  # Liveness probe
+                request = json.loads(payload)
+                reply = render_status_line(request.get('input', ''), request.get('cwd'))
+            except Exception:
+                reply = "\033[31m[Error]\033[0m Status line generation failed"
+            try:
+                self.wfile.write(reply.encode('utf-8'))
+            except OSError:
+                pass  # Client gave up waiting
+
+    class StatusLineServer(socketserver.UnixStreamServer):
+        def handle_timeout(self):
+            self.idle = True
+
+    prune_checkpoints()
+    server = StatusLineServer(str(socket_path), StatusLineHandler)
+    os.chmod(socket_path, 0o600)
+    server.timeout = idle_timeout
+    server.idle = False
+    print(f"Status line daemon listening on {socket_path}", file=sys.stderr)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while not server.idle:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description='Claude Code status line')
+        parser.add_argument('--daemon', action='store_true',
+                            help='Run as a resident daemon serving renders over a Unix socket')
+        parser.add_argument('--socket', default=None,
+                            help='Socket path for --daemon (default: $STATUS_LINE_SOCKET or the cache directory)')
+        parser.add_argument('--idle-timeout', type=float, default=None,
+                            help='Exit the daemon after this many idle seconds (default: never)')
+        args = parser.parse_args()
+        if args.daemon:
+            sys.exit(run_daemon(args.socket, args.idle_timeout))
+    
+    # Output the status line
+    print(render_status_line(sys.stdin.read()))
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Status Line Client for Claude Code
+
+Thin client for the resident status line daemon (main_status_line.py --daemon).
+Forwards the stdin JSON to the daemon and prints its reply. If the daemon is
+not running, the status line is rendered in-process instead.
+
+This is also the fast-start entry point: it runs on a plain interpreter
+without uv dependency resolution, and because main_status_line is imported
+rather than run as a script, its bytecode is cached between invocations.
+
+Author: Russo Davide (The DaveEloper)
+Email: vibecoding@pcok.it
+Project: ChatTokener Suite
+Component: VAA Bonus - Status Line
+"""
+
+import json
+import os
+import socket
+import sys
+
+DAEMON_TIMEOUT = 2.0  # Seconds to wait for the daemon before rendering in-process
+
+
+def get_daemon_socket_path():
+    """Get the Unix socket path, matching main_status_line.get_daemon_socket_path."""
+    socket_path = os.environ.get('STATUS_LINE_SOCKET')
+    if socket_path:
+        return socket_path
+    cache_dir = os.environ.get('STATUS_LINE_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'claude_status_line')
+    return os.path.join(cache_dir, 'daemon.sock')
+
+
+def ask_daemon(raw_input):
+    """Send a render request to the daemon, or return None if it is unavailable."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    request = json.dumps({"cwd": os.getcwd(), "input": raw_input}).encode('utf-8')
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_TIMEOUT)
+            sock.connect(get_daemon_socket_path())
+            sock.sendall(request)
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None
+    reply = b''.join(chunks).decode('utf-8', 'replace')
+    return reply or None
+
+
+def main():
+    raw_input = sys.stdin.read()
+    status_line = ask_daemon(raw_input)
+    if status_line is None:
+        # Daemon not running: render in-process
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from main_status_line import render_status_line
+        status_line = render_status_line(raw_input)
+    print(status_line)
+
+
+if __name__ == '__main__':
+    main()